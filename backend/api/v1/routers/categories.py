@@ -1,53 +1,69 @@
-import json
 from logging import getLogger
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from core.authentication.auth_middleware import get_current_active_user
 from core.authentication.role import allow_resource_admin
+from core.config import settings
 from core.storage import storage
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import JSONResponse
+from schemas.batch import Batch
 from schemas.categories import Category, CategoryIn, CategoryUpdate
+from schemas.pagination import Page
 from schemas.user import User
-from services.mongo_storage import change_id_key
+from services.batch import find_by_ids
+from services.decoding import decode_many
+from services.pagination import find_page
 
 router = APIRouter()
 
 
-@router.get(path="/categories", response_model=List[Category])
-def get_categories(
-    page_number: int = 1,
-    page_size: int = 10,
+@router.get(path="/categories", response_model=Page[Category])
+async def get_categories(
+    cursor: Optional[str] = None,
+    page_size: int = Query(default=10, ge=1, le=settings.PAGE_SIZE_MAX),
 ):
     """Gets all available categories"""
     logger = getLogger(__name__ + ".get_categories")
     try:
+        categories, next_cursor = await find_page(
+            storage.db["categories"],
+            {},
+            sort_field=None,
+            cursor=cursor,
+            page_size=page_size,
+            descending=False,
+        )
+        categories = decode_many(Category, categories)
 
-        skip = (page_number - 1) * page_size
+        return {"items": categories, "next_cursor": next_cursor}
+    except Exception as ex:
+        logger.error(ex)
+        raise ex
 
-        categories = (
-            storage.db["categories"].find().skip(skip).limit(page_size)
-        )
-        categories = [
-            change_id_key(json.loads(json.dumps(category, default=str)))
-            for category in categories
-        ]
 
-        return categories
+@router.get(path="/categories:batch", response_model=Batch[Category])
+async def get_categories_batch(ids: List[str] = Query()):
+    """Gets categories by their ids in the requested order"""
+    logger = getLogger(__name__ + ".get_categories_batch")
+    try:
+        categories, missing = await find_by_ids(storage.db["categories"], ids)
+
+        return {"items": decode_many(Category, categories), "missing": missing}
     except Exception as ex:
         logger.error(ex)
         raise ex
 
 
 @router.get(path="/categories/{category_id}", response_model=Category)
-def get_category(
+async def get_category(
     category_id: str,
 ):
     """Get category by its id"""
     logger = getLogger(__name__ + ".get_category")
     try:
 
-        category = storage.verify_category_record({"_id": category_id})
+        category = await storage.verify_category_record({"_id": category_id})
 
         return category
     except Exception as ex:
@@ -60,13 +76,13 @@ def get_category(
     response_model=Dict[str, str],
     dependencies=[Depends(allow_resource_admin)],
 )
-def add_category(
+async def add_category(
     data: CategoryIn, current_user: User = Depends(get_current_active_user)
 ):
     """Adds a new category"""
     logger = getLogger(__name__ + ".add_category")
     try:
-        id = storage.create_category_record(data)
+        id = await storage.create_category_record(data)
 
         response_message = {"message": "Added Category successfully", "id": id}
 
@@ -81,7 +97,7 @@ def add_category(
     response_model=Dict[str, str],
     dependencies=[Depends(allow_resource_admin)],
 )
-def update_category(
+async def update_category(
     category_id: str,
     data: CategoryUpdate,
     replace_topics: bool = False,
@@ -90,7 +106,7 @@ def update_category(
     """Updates a category"""
     logger = getLogger(__name__ + ".update_category")
     try:
-        category = storage.verify_category_record({"_id": category_id})
+        category = await storage.verify_category_record({"_id": category_id})
         update = {}
         for k, v in data.model_dump().items():
             if v is not None:
@@ -99,7 +115,7 @@ def update_category(
         if "topics" in update and replace_topics is False:
             update["topics"] = list(set(update["topics"] + category.topics))
 
-        storage.update_category_record(
+        await storage.update_category_record(
             filter={"_id": category_id},
             update=update,
         )
@@ -117,14 +133,14 @@ def update_category(
     response_model=Dict[str, str],
     dependencies=[Depends(allow_resource_admin)],
 )
-def delete_category(
+async def delete_category(
     category_id: str,
     current_user: User = Depends(get_current_active_user),
 ):
     """Removes a category"""
     logger = getLogger(__name__ + ".delete_category")
     try:
-        storage.delete_category_record({"_id": category_id})
+        await storage.delete_category_record({"_id": category_id})
         response_message = {"message": "Removed Category successfully"}
 
         return JSONResponse(response_message)
@@ -1,45 +1,96 @@
-import json
 from logging import getLogger
 from typing import Dict, List, Optional
 
 from core.authentication.auth_middleware import get_current_active_user
+from core.config import settings
 from core.storage import storage
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import JSONResponse
-from schemas.comments import Comment, CommentIn
+from schemas.batch import Batch
+from schemas.comments import Comment, CommentIn, CommentNode
+from schemas.pagination import Page
 from schemas.user import User
-from services.mongo_storage import change_id_key
+from services.batch import find_by_ids
+from services.comment_tree import find_comment_tree
+from services.decoding import decode_many
+from services.pagination import find_page
 
 router = APIRouter()
 
 
-@router.get(path="/posts/{post_id}/comments", response_model=List[Comment])
-def get_comments(
+@router.get(path="/posts/{post_id}/comments", response_model=Page[Comment])
+async def get_comments(
     post_id: str,
     reply_to_id: Optional[str] = None,
-    page_number: int = 1,
-    page_size: int = 10,
+    cursor: Optional[str] = None,
+    page_size: int = Query(default=10, ge=1, le=settings.PAGE_SIZE_MAX),
 ):
     """Gets all comments to a post"""
     logger = getLogger(__name__ + ".get_comments")
     try:
-        storage.verify_post_record({"_id": post_id})
+        await storage.verify_post_record({"_id": post_id})
+
+        comments, next_cursor = await find_page(
+            storage.db["comments"],
+            {"post_id": post_id, "reply_to_id": reply_to_id},
+            sort_field="date_created",
+            cursor=cursor,
+            page_size=page_size,
+        )
+        comments = decode_many(Comment, comments)
+
+        return {"items": comments, "next_cursor": next_cursor}
+    except Exception as ex:
+        logger.error(ex)
+        raise ex
 
-        skip = (page_number - 1) * page_size
 
-        comments = (
-            storage.db["comments"]
-            .find({"post_id": post_id, "reply_to_id": reply_to_id})
-            .sort({"date_created": -1})
-            .skip(skip)
-            .limit(page_size)
+@router.get(
+    path="/posts/{post_id}/comments/tree", response_model=Page[CommentNode]
+)
+async def get_comment_tree(
+    post_id: str,
+    reply_to_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    depth: int = Query(default=3, ge=1, le=settings.COMMENT_TREE_MAX_DEPTH),
+    breadth: int = Query(
+        default=10, ge=1, le=settings.COMMENT_TREE_MAX_BREADTH
+    ),
+):
+    """
+    Gets a page of comments to a post, or of replies to a comment,
+    with depth levels of nested replies and at most breadth replies
+    per comment. A comment's next_cursor continues its replies when
+    passed along with reply_to_id set to the comment id.
+    """
+    logger = getLogger(__name__ + ".get_comment_tree")
+    try:
+        await storage.verify_post_record({"_id": post_id})
+
+        comments, next_cursor = await find_comment_tree(
+            storage.db["comments"],
+            post_id,
+            reply_to_id,
+            cursor=cursor,
+            breadth=breadth,
+            depth=depth,
         )
-        comments = [
-            change_id_key(json.loads(json.dumps(comment, default=str)))
-            for comment in comments
-        ]
+        comments = decode_many(CommentNode, comments)
+
+        return {"items": comments, "next_cursor": next_cursor}
+    except Exception as ex:
+        logger.error(ex)
+        raise ex
+
+
+@router.get(path="/comments:batch", response_model=Batch[Comment])
+async def get_comments_batch(ids: List[str] = Query()):
+    """Gets comments by their ids in the requested order"""
+    logger = getLogger(__name__ + ".get_comments_batch")
+    try:
+        comments, missing = await find_by_ids(storage.db["comments"], ids)
 
-        return comments
+        return {"items": decode_many(Comment, comments), "missing": missing}
     except Exception as ex:
         logger.error(ex)
         raise ex
@@ -49,7 +100,7 @@ def get_comments(
     path="/posts/{post_id}/comments/{comment_id}",
     response_model=Comment,
 )
-def get_comment(
+async def get_comment(
     post_id: str,
     comment_id: str,
 ):
@@ -57,7 +108,7 @@ def get_comment(
     logger = getLogger(__name__ + ".get_comment")
     try:
 
-        comment = storage.verify_comment_record(
+        comment = await storage.verify_comment_record(
             {"_id": comment_id, "post_id": post_id}
         )
 
@@ -71,7 +122,7 @@ def get_comment(
     path="/posts/{post_id}/comments",
     response_model=Dict[str, str],
 )
-def add_comment(
+async def add_comment(
     post_id: str,
     data: CommentIn,
     current_user: User = Depends(get_current_active_user),
@@ -81,7 +132,7 @@ def add_comment(
     """
     logger = getLogger(__name__ + ".add_comment")
     try:
-        id = storage.create_comment_record(
+        id = await storage.create_comment_record(
             data=data, post_id=post_id, user_id=current_user.id
         )
 
@@ -97,7 +148,7 @@ def add_comment(
     path="/posts/{post_id}/comments/{comment_id}",
     response_model=Dict[str, str],
 )
-def delete_comment(
+async def delete_comment(
     post_id: str,
     comment_id: str,
     current_user: User = Depends(get_current_active_user),
@@ -105,7 +156,7 @@ def delete_comment(
     """Removes a user's comment to a post"""
     logger = getLogger(__name__ + ".delete_comment")
     try:
-        storage.delete_comment_record(
+        await storage.delete_comment_record(
             {"_id": comment_id, "post_id": post_id, "user_id": current_user.id}
         )
         response_message = {"message": "Removed Comment successfully"}
@@ -16,7 +16,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Token:
     """Performs user login"""
     try:
         logger = getLogger(f"{__name__}.login")
-        user = authenticate_user(form_data.username, form_data.password)
+        user = await authenticate_user(form_data.username, form_data.password)
         logger.info("User Authenticated")
         if user.status != UserStatus.VERIFIED.value:
             raise HTTPException(
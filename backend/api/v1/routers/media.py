@@ -0,0 +1,78 @@
+import mimetypes
+import os
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from services.media import (
+    media_etag,
+    media_not_found_exception,
+    media_path,
+    parse_range,
+    read_range,
+)
+
+router = APIRouter()
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.api_route(
+    path="/media/{filename}",
+    methods=["GET", "HEAD"],
+    include_in_schema=False,
+)
+async def get_media(filename: str, request: Request):
+    """
+    Serves a media file. Files are content addressed so responses
+    are cached for good, validated with a strong ETag and can be
+    fetched in byte ranges.
+    """
+    path = media_path(filename)
+    try:
+        size = (await run_in_threadpool(os.stat, path)).st_size
+    except FileNotFoundError:
+        raise media_not_found_exception
+
+    etag = media_etag(filename)
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = parse_range(range_header, size)
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+    media_type = (
+        mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    )
+
+    if request.method == "HEAD":
+        return Response(
+            status_code=status_code, headers=headers, media_type=media_type
+        )
+
+    return StreamingResponse(
+        read_range(path, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
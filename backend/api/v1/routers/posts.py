@@ -1,32 +1,60 @@
-import json
-from datetime import UTC, datetime
 from logging import getLogger
 from typing import Dict, List, Optional
 
+from bson.objectid import ObjectId
 from core.authentication.auth_middleware import get_current_active_user
+from core.config import settings
 from core.storage import storage
-from fastapi import APIRouter, Depends, File, Form, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Form,
+    Query,
+    UploadFile,
+)
+from fastapi.responses import JSONResponse, Response
+from schemas.batch import Batch
+from schemas.pagination import Page
 from schemas.posts import Post, PostIn, PostSortTypes
 from schemas.user import User
-from services.mongo_storage import change_id_key
+from services.batch import find_by_ids
+from services.decoding import decode_many
+from services.feed_cache import feed_cache
+from services.image_variants import generate_image_variants
+from services.media import media_url, save_upload
+from services.pagination import find_page
+from services.ranking import FEED_SORT_FIELDS
+from services.timeline import timelines
 
 router = APIRouter()
 
 
-@router.get(path="/posts/general_feed", response_model=List[Post])
-def get_posts_general_feed(
+async def add_post_image_variants(post_id: str, filename: str):
+    """Generates the resized copies of a post image and records them"""
+    logger = getLogger(__name__ + ".add_post_image_variants")
+    try:
+        variants = await generate_image_variants(filename)
+
+        await storage.update_post_record(
+            filter={"_id": post_id}, update={"image_variants": variants}
+        )
+    except Exception as ex:
+        logger.error(ex)
+
+
+@router.get(path="/posts/general_feed", response_model=Page[Post])
+async def get_posts_general_feed(
     category_id: Optional[str] = None,
     category_topic: Optional[str] = None,
-    page_number: int = 1,
-    page_size: int = 10,
+    cursor: Optional[str] = None,
+    page_size: int = Query(default=10, ge=1, le=settings.PAGE_SIZE_MAX),
     sort_by: PostSortTypes = PostSortTypes.HOT,
 ):
     """Gets the general post feed posts"""
     logger = getLogger(__name__ + ".get_posts_general_feed")
     try:
-
-        skip = (page_number - 1) * page_size
         filter = {}
 
         if category_id is not None:
@@ -34,66 +62,36 @@ def get_posts_general_feed(
         if category_topic is not None:
             filter["category_topic"] = category_topic
 
-        if sort_by == PostSortTypes.NEW:
-            pipeline = [
-                {"$match": filter},
-                {"$sort": {"date_created": -1}},
-                {"$skip": skip},
-                {"$limit": page_size},
-            ]
-        elif sort_by == PostSortTypes.TOP:
-            pipeline = [
-                {"$match": filter},
-                {
-                    "$addFields": {
-                        "difference": {"$subtract": ["$likes", "$dislikes"]}
-                    }
-                },
-                {"$sort": {"difference": -1}},
-                {"$skip": skip},
-                {"$limit": page_size},
-            ]
-        else:
-            pipeline = [
-                {"$match": filter},
-                {
-                    "$addFields": {
-                        "currentDate": datetime.now(UTC),
-                        "score": {
-                            "$divide": [
-                                {"$subtract": ["$likes", "$dislikes"]},
-                                {
-                                    "$subtract": [
-                                        datetime.now(UTC),
-                                        "$date_created",
-                                    ]
-                                },
-                            ]
-                        },
-                    }
-                },
-                {"$sort": {"score": -1}},
-                {"$skip": skip},
-                {"$limit": page_size},
-            ]
-
-        posts = storage.db["posts"].aggregate(pipeline)
-        # posts = storage.db["posts"].find(filter).skip(skip).limit(page_size)
-        posts = [
-            change_id_key(json.loads(json.dumps(post, default=str)))
-            for post in posts
-        ]
-
-        return posts
+        cache_key = await feed_cache.key(
+            sort_by, (category_id, category_topic), cursor, page_size
+        )
+        page = await feed_cache.get(cache_key)
+        if page is not None:
+            return Response(page, media_type="application/json")
+
+        posts, next_cursor = await find_page(
+            storage.db["posts"],
+            filter,
+            sort_field=FEED_SORT_FIELDS[sort_by],
+            cursor=cursor,
+            page_size=page_size,
+        )
+        posts = decode_many(Post, posts)
+
+        page = Page[Post](items=posts, next_cursor=next_cursor)
+        page = page.model_dump_json().encode()
+        await feed_cache.set(cache_key, page, next_cursor)
+
+        return Response(page, media_type="application/json")
     except Exception as ex:
         logger.error(ex)
         raise ex
 
 
-@router.get(path="/posts/user_feed", response_model=List[Post])
-def get_posts_user_feed(
-    page_number: int = 1,
-    page_size: int = 10,
+@router.get(path="/posts/user_feed", response_model=Page[Post])
+async def get_posts_user_feed(
+    cursor: Optional[str] = None,
+    page_size: int = Query(default=10, ge=1, le=settings.PAGE_SIZE_MAX),
     sort_by: PostSortTypes = PostSortTypes.HOT,
     current_user: User = Depends(get_current_active_user),
 ):
@@ -103,81 +101,34 @@ def get_posts_user_feed(
     """
     logger = getLogger(__name__ + ".get_posts_user_feed")
     try:
+        category_ids = current_user.subscribed or [None]
+
+        posts, next_cursor = await timelines.find_page(
+            storage.db["posts"],
+            category_ids,
+            sort_by,
+            cursor=cursor,
+            page_size=page_size,
+        )
+        posts = decode_many(Post, posts)
 
-        skip = (page_number - 1) * page_size
-        filter = {}
-        if len(current_user.subscribed) > 0:
-            filter = {"category_id": {"$in": current_user.subscribed}}
-
-        if sort_by == PostSortTypes.NEW:
-            pipeline = [
-                {"$match": filter},
-                {"$sort": {"date_created": -1}},
-                {"$skip": skip},
-                {"$limit": page_size},
-            ]
-        elif sort_by == PostSortTypes.TOP:
-            pipeline = [
-                {"$match": filter},
-                {
-                    "$addFields": {
-                        "difference": {"$subtract": ["$likes", "$dislikes"]}
-                    }
-                },
-                {"$sort": {"difference": -1}},
-                {"$skip": skip},
-                {"$limit": page_size},
-            ]
-        else:
-            pipeline = [
-                {"$match": filter},
-                {
-                    "$addFields": {
-                        "currentDate": datetime.now(UTC),
-                        "score": {
-                            "$divide": [
-                                {"$subtract": ["$likes", "$dislikes"]},
-                                {
-                                    "$subtract": [
-                                        datetime.now(UTC),
-                                        "$date_created",
-                                    ]
-                                },
-                            ]
-                        },
-                    }
-                },
-                {"$sort": {"score": -1}},
-                {"$skip": skip},
-                {"$limit": page_size},
-            ]
-
-        posts = storage.db["posts"].aggregate(pipeline)
-        # posts = storage.db["posts"].find(filter).skip(skip).limit(page_size)
-        posts = [
-            change_id_key(json.loads(json.dumps(post, default=str)))
-            for post in posts
-        ]
-
-        return posts
+        return {"items": posts, "next_cursor": next_cursor}
     except Exception as ex:
         logger.error(ex)
         raise ex
 
 
-@router.get(path="/posts", response_model=List[Post])
-def get_posts(
+@router.get(path="/posts", response_model=Page[Post])
+async def get_posts(
     category_id: Optional[str] = None,
     category_topic: Optional[str] = None,
-    page_number: int = 1,
-    page_size: int = 10,
+    cursor: Optional[str] = None,
+    page_size: int = Query(default=10, ge=1, le=settings.PAGE_SIZE_MAX),
     current_user: User = Depends(get_current_active_user),
 ):
     """Gets posts created by the user"""
     logger = getLogger(__name__ + ".get_posts")
     try:
-
-        skip = (page_number - 1) * page_size
         filter = {"user_id": current_user.id}
 
         if category_id is not None:
@@ -185,19 +136,29 @@ def get_posts(
         if category_topic is not None:
             filter["category_topic"] = category_topic
 
-        posts = (
-            storage.db["posts"]
-            .find(filter)
-            .sort({"date_created": -1})
-            .skip(skip)
-            .limit(page_size)
+        posts, next_cursor = await find_page(
+            storage.db["posts"],
+            filter,
+            sort_field="date_created",
+            cursor=cursor,
+            page_size=page_size,
         )
-        posts = [
-            change_id_key(json.loads(json.dumps(post, default=str)))
-            for post in posts
-        ]
+        posts = decode_many(Post, posts)
+
+        return {"items": posts, "next_cursor": next_cursor}
+    except Exception as ex:
+        logger.error(ex)
+        raise ex
+
+
+@router.get(path="/posts:batch", response_model=Batch[Post])
+async def get_posts_batch(ids: List[str] = Query()):
+    """Gets posts by their ids in the requested order"""
+    logger = getLogger(__name__ + ".get_posts_batch")
+    try:
+        posts, missing = await find_by_ids(storage.db["posts"], ids)
 
-        return posts
+        return {"items": decode_many(Post, posts), "missing": missing}
     except Exception as ex:
         logger.error(ex)
         raise ex
@@ -207,14 +168,14 @@ def get_posts(
     path="/posts/{post_id}",
     response_model=Post,
 )
-def get_post(
+async def get_post(
     post_id: str,
 ):
     """Get post by its id"""
     logger = getLogger(__name__ + ".get_post")
     try:
 
-        post = storage.verify_post_record({"_id": post_id})
+        post = await storage.verify_post_record({"_id": post_id})
 
         return post
     except Exception as ex:
@@ -227,6 +188,7 @@ def get_post(
     response_model=Dict[str, str],
 )
 async def add_post(
+    background_tasks: BackgroundTasks,
     # data: PostIn,
     post_image: UploadFile = File(None),
     category_id: str = Form(...),
@@ -236,12 +198,12 @@ async def add_post(
     current_user: User = Depends(get_current_active_user),
 ):
     """
-    Adds a new post to a post to a category
+    Adds a new post to a post to a category.
+    Resized copies of the post image are generated after the response.
     """
     logger = getLogger(__name__ + ".add_post")
     try:
 
-        has_image = post_image is not None
         data = PostIn(
             category_id=category_id,
             category_topic=category_topic,
@@ -249,17 +211,23 @@ async def add_post(
             content=content,
         )
 
-        id = storage.create_post_record(data, current_user.id)
-
-        if has_image:
-            filename = f"{id}.{post_image.filename.split('.')[-1]}"
-            with open(f"./media/{filename}", "wb") as f:
-                f.write(await post_image.read())
+        id = ObjectId()
+        filename = None
+        if post_image is not None:
+            filename = await save_upload(post_image)
+
+        # A file left unreferenced by a failed insert may be shared with
+        # a concurrent identical upload, so it is left to manage.py
+        # media prune rather than removed here
+        id = await storage.create_post_record(
+            data,
+            current_user.id,
+            id=id,
+            post_image_url=media_url(filename) if filename else None,
+        )
 
-            storage.update_post_record(
-                filter={"_id": id},
-                update={"post_image_url": f"/api/v1/media/{filename}"},
-            )
+        if filename is not None:
+            background_tasks.add_task(add_post_image_variants, id, filename)
 
         response_message = {"message": "Added Post successfully", "id": id}
 
@@ -273,14 +241,14 @@ async def add_post(
     path="/posts/{post_id}",
     response_model=Dict[str, str],
 )
-def delete_post(
+async def delete_post(
     post_id: str,
     current_user: User = Depends(get_current_active_user),
 ):
     """Removes a user's post"""
     logger = getLogger(__name__ + ".delete_post")
     try:
-        storage.delete_post_record(
+        await storage.delete_post_record(
             {"_id": post_id, "user_id": current_user.id}
         )
         response_message = {"message": "Removed Post successfully"}
@@ -1,44 +1,79 @@
-import json
 from logging import getLogger
 from typing import Dict, List, Optional
 
 from core.authentication.auth_middleware import get_current_active_user
+from core.config import settings
 from core.storage import storage
-from fastapi import APIRouter, Body, Depends
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from fastapi.responses import JSONResponse
-from schemas.reactions import Reaction, ReactionIn
+from schemas.pagination import Page
+from schemas.reactions import Reaction
 from schemas.user import User
-from services.mongo_storage import change_id_key
+from services.decoding import decode_many
+from services.pagination import find_page
 
 router = APIRouter()
 
 
 @router.get(
-    path="/posts_comments/{target_id}/reactions", response_model=List[Reaction]
+    path="/posts_comments/{target_id}/reactions", response_model=Page[Reaction]
 )
-def get_reactions(
+async def get_reactions(
     target_id: str,
     is_like: Optional[bool] = None,
-    page_number: int = 1,
-    page_size: int = 10,
+    cursor: Optional[str] = None,
+    page_size: int = Query(default=10, ge=1, le=settings.PAGE_SIZE_MAX),
 ):
     """Gets all reactions to a post or comment"""
     logger = getLogger(__name__ + ".get_reactions")
     try:
 
-        skip = (page_number - 1) * page_size
         filter = {"target_id": target_id}
         if is_like is not None:
             filter["is_like"] = is_like
-        reactions = (
-            storage.db["reactions"].find(filter).skip(skip).limit(page_size)
+        reactions, next_cursor = await find_page(
+            storage.db["reactions"],
+            filter,
+            sort_field=None,
+            cursor=cursor,
+            page_size=page_size,
         )
-        reactions = [
-            change_id_key(json.loads(json.dumps(reaction, default=str)))
-            for reaction in reactions
-        ]
+        reactions = decode_many(Reaction, reactions)
 
-        return reactions
+        return {"items": reactions, "next_cursor": next_cursor}
+    except Exception as ex:
+        logger.error(ex)
+        raise ex
+
+
+@router.get(
+    path="/posts_comments/reactions/me",
+    response_model=Dict[str, Optional[Reaction]],
+)
+async def get_my_reactions(
+    target_ids: List[str] = Query(),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Gets the user's reactions to a set of posts and comments,
+    keyed by target id with null for targets without a reaction
+    """
+    logger = getLogger(__name__ + ".get_my_reactions")
+    try:
+        if len(target_ids) > settings.REACTION_LOOKUP_MAX_TARGETS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Too many target ids. Maximum is "
+                + f"{settings.REACTION_LOOKUP_MAX_TARGETS}",
+            )
+
+        reactions = await storage.get_user_reaction_records(
+            current_user.id, list(set(target_ids))
+        )
+
+        return {
+            target_id: reactions.get(target_id) for target_id in target_ids
+        }
     except Exception as ex:
         logger.error(ex)
         raise ex
@@ -48,7 +83,7 @@ def get_reactions(
     path="/posts_comments/{target_id}/reactions/{reaction_id}",
     response_model=Reaction,
 )
-def get_reaction(
+async def get_reaction(
     target_id: str,
     reaction_id: str,
 ):
@@ -56,7 +91,7 @@ def get_reaction(
     logger = getLogger(__name__ + ".get_reaction")
     try:
 
-        reaction = storage.verify_reaction_record(
+        reaction = await storage.verify_reaction_record(
             {"_id": reaction_id, "target_id": target_id}
         )
 
@@ -70,7 +105,7 @@ def get_reaction(
     path="/posts_comments/{target_id}/reactions",
     response_model=Dict[str, str],
 )
-def add_reaction(
+async def add_reaction(
     target_id: str,
     is_like: bool = Body(embed=True, default=True),
     current_user: User = Depends(get_current_active_user),
@@ -81,20 +116,9 @@ def add_reaction(
     """
     logger = getLogger(__name__ + ".add_reaction")
     try:
-        existing_reaction = storage.get_reaction_record(
-            {"target_id": target_id, "user_id": current_user.id}
+        id = await storage.set_reaction_record(
+            target_id=target_id, user_id=current_user.id, is_like=is_like
         )
-        if existing_reaction:
-            storage.update_reaction_record(
-                filter={"_id": existing_reaction.id},
-                update={"is_like": is_like},
-            )
-            id = existing_reaction.id
-        else:
-            id = storage.create_reaction_record(
-                ReactionIn(target_id=target_id, is_like=is_like),
-                current_user.id,
-            )
 
         response_message = {"message": "Added Reaction successfully", "id": id}
 
@@ -108,14 +132,14 @@ def add_reaction(
     path="/posts_comments/{target_id}/reactions/me",
     response_model=Dict[str, str],
 )
-def delete_reaction(
+async def delete_reaction(
     target_id: str,
     current_user: User = Depends(get_current_active_user),
 ):
     """Removes a user's reaction to a post or comment"""
     logger = getLogger(__name__ + ".delete_reaction")
     try:
-        storage.delete_reaction_record(
+        await storage.delete_reaction_record(
             {"target_id": target_id, "user_id": current_user.id}
         )
         response_message = {"message": "Removed Reaction successfully"}
@@ -19,18 +19,18 @@ router = APIRouter()
 
 
 @router.post(path="/register", response_model=Dict[str, str])
-def register_user(user_data: s_user.UserIn):
+async def register_user(user_data: s_user.UserIn):
     """Registers a user"""
     logger = getLogger(__name__ + ".register_user")
     try:
-        id = storage.create_user_record(user_data)
+        id = await storage.create_user_record(user_data)
 
         verification_token = create_access_token(
             {"id": id, "sub": user_data.email, "type": "email_verification"},
             timedelta(hours=1),
         )
 
-        send_email_verification(user_data.email, verification_token)
+        await send_email_verification(user_data.email, verification_token)
 
         response_message = {
             "message": "Account created successfully Email Verification sent.",
@@ -45,7 +45,9 @@ def register_user(user_data: s_user.UserIn):
 
 
 @router.post("/register/verify", response_model=Dict[str, str])
-def verify_email(verification_token: EmailVerificationToken) -> JSONResponse:
+async def verify_email(
+    verification_token: EmailVerificationToken,
+) -> JSONResponse:
     """Performs user email verification"""
     try:
         token_data = verify_access_token(verification_token.verification_token)
@@ -61,7 +63,7 @@ def verify_email(verification_token: EmailVerificationToken) -> JSONResponse:
             detail="Invalid token type",
         )
 
-    storage.update_user_record(
+    await storage.update_user_record(
         filter={"email": token_data.email},
         update={"status": s_user.UserStatus.VERIFIED},
     )
@@ -69,9 +71,9 @@ def verify_email(verification_token: EmailVerificationToken) -> JSONResponse:
 
 
 @router.post("/register/verify/resend", response_model=Dict[str, str])
-def resend_verification(email: str = Body(embed=True)) -> JSONResponse:
+async def resend_verification(email: str = Body(embed=True)) -> JSONResponse:
     """Resends email verification"""
-    user = storage.verify_user_record({"email": email})
+    user = await storage.verify_user_record({"email": email})
 
     if user.status != "unverified":
         raise HTTPException(
@@ -88,7 +90,7 @@ def resend_verification(email: str = Body(embed=True)) -> JSONResponse:
         timedelta(hours=1),
     )
 
-    send_email_verification(user.email, verification_token)
+    await send_email_verification(user.email, verification_token)
 
     response_message = {
         "message": "Email verification token resent",
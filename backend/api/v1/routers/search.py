@@ -0,0 +1,74 @@
+from logging import getLogger
+from typing import Optional
+
+from core.config import settings
+from core.storage import storage
+from fastapi import APIRouter, Query
+from schemas.comments import Comment
+from schemas.pagination import Page
+from schemas.posts import Post
+from services.decoding import decode_many
+from services.search import search_page
+
+router = APIRouter()
+
+
+@router.get(path="/search/posts", response_model=Page[Post])
+async def search_posts(
+    q: str = Query(min_length=1, max_length=200),
+    category_id: Optional[str] = None,
+    category_topic: Optional[str] = None,
+    cursor: Optional[str] = None,
+    page_size: int = Query(default=10, ge=1, le=settings.PAGE_SIZE_MAX),
+):
+    """Searches the titles and contents of posts, most relevant first"""
+    logger = getLogger(__name__ + ".search_posts")
+    try:
+        filter = {}
+        if category_id is not None:
+            filter["category_id"] = category_id
+        if category_topic is not None:
+            filter["category_topic"] = category_topic
+
+        posts, next_cursor = await search_page(
+            storage.db["posts"],
+            q,
+            filter,
+            cursor=cursor,
+            page_size=page_size,
+        )
+        posts = decode_many(Post, posts)
+
+        return {"items": posts, "next_cursor": next_cursor}
+    except Exception as ex:
+        logger.error(ex)
+        raise ex
+
+
+@router.get(path="/search/comments", response_model=Page[Comment])
+async def search_comments(
+    q: str = Query(min_length=1, max_length=200),
+    post_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    page_size: int = Query(default=10, ge=1, le=settings.PAGE_SIZE_MAX),
+):
+    """Searches the contents of comments, most relevant first"""
+    logger = getLogger(__name__ + ".search_comments")
+    try:
+        filter = {}
+        if post_id is not None:
+            filter["post_id"] = post_id
+
+        comments, next_cursor = await search_page(
+            storage.db["comments"],
+            q,
+            filter,
+            cursor=cursor,
+            page_size=page_size,
+        )
+        comments = decode_many(Comment, comments)
+
+        return {"items": comments, "next_cursor": next_cursor}
+    except Exception as ex:
+        logger.error(ex)
+        raise ex
@@ -1,15 +1,18 @@
-from typing import Dict
+from typing import Dict, List
 
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from fastapi.responses import JSONResponse
 
 from core.authentication.auth_middleware import (
     authenticate_user,
     get_current_active_user,
 )
-from core.authentication.hashing import get_hash
+from core.authentication.hashing import get_hash_async
 from core.storage import storage
-from schemas.user import User, UserOut
+from schemas.batch import Batch
+from schemas.user import User, UserOut, UserPublic
+from services.batch import find_by_ids
+from services.decoding import decode_many
 
 router = APIRouter()
 
@@ -23,13 +26,23 @@ async def get_user_details(
     return current_user
 
 
+@router.get(path="/users:batch", response_model=Batch[UserPublic])
+async def get_users_batch(ids: List[str] = Query()):
+    """Gets the public details of users by their ids in the requested order"""
+    users, missing = await find_by_ids(
+        storage.db["users"], ids, projection={"username": 1, "date_created": 1}
+    )
+
+    return {"items": decode_many(UserPublic, users), "missing": missing}
+
+
 @router.patch(path="/users/me")
 async def update_user_details(
     username: str = Body(embed=True),
     current_user: User = Depends(get_current_active_user),
 ) -> Dict[str, str]:
     """Updates the user's details"""
-    storage.update_user_record(
+    await storage.update_user_record(
         filter={"_id": current_user.id}, update={"username": username}
     )
     message = {"message": "details updated successfully"}
@@ -37,12 +50,12 @@ async def update_user_details(
 
 
 @router.delete(path="/users/me")
-def delete_account(
+async def delete_account(
     current_user: User = Depends(get_current_active_user),
 ) -> Dict[str, str]:
     """Deletes a user's account"""
 
-    storage.delete_user_record({"_id": current_user.id})
+    await storage.delete_user_record({"_id": current_user.id})
     message = {"message": "account deleted successfully"}
     return JSONResponse(content=message)
 
@@ -55,7 +68,7 @@ async def change_user_password(
 ) -> Dict[str, str]:
     """Changes a user's password"""
 
-    authenticate_user(current_user.email, current_password)
+    await authenticate_user(current_user.email, current_password)
 
     if len(new_password) < 8:
         raise HTTPException(
@@ -63,8 +76,9 @@ async def change_user_password(
             detail="Invalid password length. Password length must be at least 8 characters",
         )
 
-    storage.update_user_record(
-        {"_id": current_user.id}, {"password": get_hash(new_password)}
+    await storage.update_user_record(
+        {"_id": current_user.id},
+        {"password": await get_hash_async(new_password)},
     )
     message = {"message": "password changed successfully"}
     return JSONResponse(content=message)
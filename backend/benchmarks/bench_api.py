@@ -0,0 +1,369 @@
+"""
+Load and latency benchmark of the API hot paths. Seeds a synthetic
+dataset into a dedicated database, starts main.app in process behind
+httpx's ASGI transport and drives each scenario at a fixed concurrency,
+reporting latency percentiles, throughput and the number of Mongo
+commands issued per request. Results are saved as JSON and can be
+compared with an earlier run to spot regressions.
+
+Run from the backend directory against a local mongod with:
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --compare benchmarks/results/old.json
+
+The benchmark database is dropped before seeding, so never point
+--db-name at a database holding real data.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+from datetime import UTC, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from pymongo import monitoring
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts the commands sent to Mongo by every client"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        with self.lock:
+            self.count += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mongodb-uri",
+        default=os.environ.get("MONGODB_URI", "mongodb://localhost:27017"),
+    )
+    parser.add_argument("--db-name", default="buzz-board-benchmark")
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="use mongomock-motor instead of mongod (no command counts)",
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--reactions", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scenarios", nargs="*", help="run only these scenarios"
+    )
+    parser.add_argument("--output", help="JSON file to save the results to")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Sets the settings of the app before it is imported"""
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_DAYS", "7")
+    os.environ["MONGODB_URI"] = args.mongodb_uri
+    os.environ["DB_NAME"] = args.db_name
+    # Keep background jobs from adding Mongo commands to the counts
+    os.environ["MAIL_WORKER_ENABLED"] = "false"
+
+
+def summarize(
+    latencies: List[float], errors: int, elapsed: float, commands: int
+) -> Dict[str, Any]:
+    """Gets the statistics of a scenario run"""
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": round(cuts[49] * 1000, 3),
+            "p95": round(cuts[94] * 1000, 3),
+            "p99": round(cuts[98] * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        },
+        "mongo_commands_per_request": (
+            None if commands is None else round(commands / len(latencies), 2)
+        ),
+    }
+
+
+async def run_scenario(
+    send: Callable[[], Awaitable[httpx.Response]],
+    requests: int,
+    warmup: int,
+    concurrency: int,
+    counter: Optional[CommandCounter],
+) -> Dict[str, Any]:
+    """Sends requests from concurrency workers and measures them"""
+    for _ in range(warmup):
+        await send()
+
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await send()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    commands = counter.count if counter else None
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    if counter:
+        commands = counter.count - commands
+
+    return summarize(latencies, errors, elapsed, commands)
+
+
+def build_scenarios(
+    client: httpx.AsyncClient,
+    dataset: Any,
+    tokens: List[Dict[str, str]],
+    rng: random.Random,
+) -> Dict[str, Callable[[], Awaitable[httpx.Response]]]:
+    """Gets the request senders of the benchmark scenarios"""
+    from benchmarks.dataset import PASSWORD
+
+    post_ids = [str(post["_id"]) for post in dataset.posts]
+
+    def auth() -> Dict[str, str]:
+        return {"Authorization": f"Bearer {rng.choice(tokens)['token']}"}
+
+    def feed(path: str, sort_by: str, authenticated: bool):
+        async def send():
+            return await client.get(
+                path,
+                params={"sort_by": sort_by},
+                headers=auth() if authenticated else None,
+            )
+
+        return send
+
+    async def add_reaction():
+        return await client.post(
+            f"/api/v1/posts_comments/{rng.choice(post_ids)}/reactions",
+            json={"is_like": rng.random() < 0.75},
+            headers=auth(),
+        )
+
+    async def add_comment():
+        return await client.post(
+            f"/api/v1/posts/{rng.choice(post_ids)}/comments",
+            json={"content": "Benchmark comment"},
+            headers=auth(),
+        )
+
+    async def login():
+        return await client.post(
+            "/api/v1/login",
+            data={
+                "username": rng.choice(tokens)["email"],
+                "password": PASSWORD,
+            },
+        )
+
+    async def get_current_user():
+        return await client.get("/api/v1/users/me", headers=auth())
+
+    scenarios = {}
+    for sort_by in ["hot", "new", "top"]:
+        scenarios[f"general_feed_{sort_by}"] = feed(
+            "/api/v1/posts/general_feed", sort_by, False
+        )
+        scenarios[f"user_feed_{sort_by}"] = feed(
+            "/api/v1/posts/user_feed", sort_by, True
+        )
+    scenarios["add_reaction"] = add_reaction
+    scenarios["add_comment"] = add_comment
+    scenarios["login"] = login
+    scenarios["get_current_user"] = get_current_user
+
+    return scenarios
+
+
+def git_revision() -> Optional[str]:
+    """Gets the checked out commit, if any"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], path: str) -> None:
+    """Prints the change of each scenario against earlier results"""
+    with open(path) as file:
+        baseline = json.load(file)["scenarios"]
+
+    print(f"\nchange against {path}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        p95 = result["latency_ms"]["p95"] / old["latency_ms"]["p95"] - 1
+        rps = result["throughput_rps"] / old["throughput_rps"] - 1
+        print(f"{name:>22}: p95 {p95:+7.1%}  throughput {rps:+7.1%}")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    counter = None
+    if not args.in_memory:
+        counter = CommandCounter()
+        monitoring.register(counter)
+
+    # The app reads its settings and creates its client on import
+    from benchmarks.dataset import (
+        DatasetSpec,
+        build_dataset,
+        dataset_counts,
+        insert_dataset,
+    )
+    from core.authentication.auth_token import create_access_token
+    from core.config import settings
+    from core.storage import storage
+
+    app = importlib.import_module("main").app
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.in_memory:
+        from mongomock_motor import AsyncMongoMockClient
+
+        storage.client = AsyncMongoMockClient(tz_aware=True)
+        storage.db = storage.client[settings.DB_NAME]
+
+    spec = DatasetSpec(
+        users=args.users,
+        categories=args.categories,
+        posts=args.posts,
+        comments=args.comments,
+        reactions=args.reactions,
+        seed=args.seed,
+    )
+    dataset = build_dataset(spec)
+    await storage.client.drop_database(settings.DB_NAME)
+    await insert_dataset(storage.db, dataset)
+
+    server_version = None
+    if not args.in_memory:
+        server_version = (await storage.db.command("buildInfo"))["version"]
+
+    tokens = [
+        {
+            "email": user["email"],
+            "token": create_access_token(
+                {
+                    "sub": user["email"],
+                    "id": str(user["_id"]),
+                    "type": "bearer",
+                }
+            ),
+        }
+        for user in dataset.users
+    ]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            scenarios = build_scenarios(
+                client, dataset, tokens, random.Random(args.seed)
+            )
+            for name, send in scenarios.items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                results[name] = await run_scenario(
+                    send,
+                    args.requests,
+                    args.warmup,
+                    args.concurrency,
+                    counter,
+                )
+                latency = results[name]["latency_ms"]
+                print(
+                    f"{name:>22}: p50 {latency['p50']:8.2f} ms"
+                    f"  p95 {latency['p95']:8.2f} ms"
+                    f"  p99 {latency['p99']:8.2f} ms"
+                    f"  {results[name]['throughput_rps']:8.1f} req/s"
+                    f"  {results[name]['mongo_commands_per_request']} cmd/req"
+                    f"  {results[name]['errors']} errors"
+                )
+
+    return {
+        "meta": {
+            "date": datetime.now(UTC).isoformat(),
+            "release": settings.RELEASE_ID,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mongo": server_version or "mongomock",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "dataset": dataset_counts(dataset),
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+
+    report = asyncio.run(run(args))
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join("benchmarks", "results", f"api-{stamp}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nresults saved to {output}")
+
+    if args.compare:
+        compare(report["scenarios"], args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares verify_access_token with and without the decoded token cache.
+
+Run from the backend directory with:
+    python -m benchmarks.bench_auth_token
+"""
+
+import argparse
+import os
+import timeit
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_DAYS", "7")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from core.authentication.auth_token import (  # noqa: E402
+    create_access_token,
+    token_cache,
+    verify_access_token,
+)
+
+
+def cold(token: str):
+    token_cache.clear()
+    verify_access_token(token)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = create_access_token(
+        {"sub": "user@example.com", "id": "0" * 24, "type": "bearer"}
+    )
+    clear_cost = min(
+        timeit.repeat(token_cache.clear, number=args.repeat, repeat=3)
+    )
+
+    results = {}
+    for name, func in [
+        ("cold", lambda: cold(token)),
+        ("cached", lambda: verify_access_token(token)),
+    ]:
+        total = min(timeit.repeat(func, number=args.repeat, repeat=3))
+        if name == "cold":
+            total -= clear_cost
+        results[name] = total / args.repeat * 1e6
+        print(f"{name:>8}: {results[name]:8.2f} us per verification")
+
+    print(f"{'speedup':>8}: {results['cold'] / results['cached']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compares the CPU cost of decoding a 100-post feed page with the
+former json.dumps/json.loads round trip against services.decoding.
+
+Run from the backend directory with:
+    python -m benchmarks.bench_decoding
+"""
+
+import argparse
+import json
+import timeit
+from datetime import UTC, datetime, timedelta
+
+from bson.objectid import ObjectId
+from schemas.posts import Post
+from services.decoding import decode_many
+
+
+def make_posts(count: int):
+    """Builds post documents as they are returned by the driver"""
+    date = datetime.now(UTC).replace(tzinfo=None)
+    category_id = str(ObjectId())
+
+    return [
+        {
+            "_id": ObjectId(),
+            "category_id": category_id,
+            "category_topic": "general",
+            "title": f"Post title {i}",
+            "content": "Lorem ipsum dolor sit amet " * 20,
+            "user_id": str(ObjectId()),
+            "post_image_url": None,
+            "likes": i * 3,
+            "dislikes": i,
+            "comments": i * 2,
+            "net_votes": i * 2,
+            "hot_score": 1961.5 + i / 1000,
+            "date_created": date - timedelta(minutes=i),
+            "date_modified": date,
+        }
+        for i in range(count)
+    ]
+
+
+def json_round_trip(documents):
+    """The former decoding path: JSON round trip then validation"""
+    posts = []
+    for document in documents:
+        data = json.loads(json.dumps(document, default=str))
+        data["id"] = data.pop("_id")
+        posts.append(Post(**data))
+
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    pages = [make_posts(args.page_size) for _ in range(2)]
+    # decode_many consumes the documents so each run gets a fresh copy
+    results = {}
+    for name, decoder in [
+        ("json round trip", json_round_trip),
+        ("direct decode", lambda docs: decode_many(Post, docs)),
+    ]:
+        timer = timeit.Timer(
+            lambda: decoder([dict(document) for document in pages[0]])
+        )
+        copy_cost = min(
+            timeit.repeat(
+                lambda: [dict(document) for document in pages[1]],
+                number=args.repeat,
+                repeat=3,
+            )
+        )
+        total = min(timer.repeat(number=args.repeat, repeat=3)) - copy_cost
+        results[name] = total / args.repeat * 1e6
+        print(f"{name:>16}: {results[name]:8.1f} us per page")
+
+    saved = results["json round trip"] - results["direct decode"]
+    print(
+        f"{'saved':>16}: {saved:8.1f} us per {args.page_size}-post page"
+        f" ({saved / results['json round trip']:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
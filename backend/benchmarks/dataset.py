@@ -0,0 +1,288 @@
+"""
+Seeds a database with a synthetic BuzzBoard dataset whose counters
+agree with its comments and reactions, as if created through the API.
+The document builders are shared with generate_dataset so both carry
+the fields the storage writes.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson.objectid import ObjectId
+from core.authentication.hashing import get_hash
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from services.ranking import score_fields
+
+PASSWORD = "benchmark-password"
+BATCH_SIZE = 1000
+
+
+@dataclass
+class DatasetSpec:
+    users: int = 200
+    categories: int = 20
+    posts: int = 5000
+    comments: int = 20000
+    reactions: int = 50000
+    reply_ratio: float = 0.3
+    days: int = 30
+    seed: int = 0
+
+
+@dataclass
+class Dataset:
+    users: List[Dict[str, Any]] = field(default_factory=list)
+    categories: List[Dict[str, Any]] = field(default_factory=list)
+    posts: List[Dict[str, Any]] = field(default_factory=list)
+    comments: List[Dict[str, Any]] = field(default_factory=list)
+    reactions: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def user_document(
+    id: ObjectId,
+    username: str,
+    email: str,
+    password: str,
+    subscribed: List[str],
+    date: datetime,
+) -> Dict[str, Any]:
+    """Builds a verified user as stored by the storage"""
+    return {
+        "_id": id,
+        "username": username,
+        "email": email,
+        "password": password,
+        "status": "verified",
+        "role": "user",
+        "subscribed": subscribed,
+        "date_created": date,
+        "date_modified": date,
+    }
+
+
+def category_document(
+    id: ObjectId,
+    name: str,
+    description: str,
+    topics: List[str],
+    date: datetime,
+) -> Dict[str, Any]:
+    """Builds a category as stored by the storage"""
+    return {
+        "_id": id,
+        "name": name,
+        "description": description,
+        "topics": topics,
+        "date_created": date,
+        "date_modified": date,
+    }
+
+
+def post_document(
+    id: ObjectId,
+    user_id: str,
+    category_id: str,
+    category_topic: str,
+    title: str,
+    content: str,
+    date: datetime,
+    likes: int = 0,
+    dislikes: int = 0,
+    comments: int = 0,
+) -> Dict[str, Any]:
+    """
+    Builds a post as stored by the storage. Call set_post_scores once
+    its counters are final.
+    """
+    return {
+        "_id": id,
+        "user_id": user_id,
+        "category_id": category_id,
+        "category_topic": category_topic,
+        "title": title,
+        "content": content,
+        "post_image_url": None,
+        "image_variants": None,
+        "likes": likes,
+        "dislikes": dislikes,
+        "comments": comments,
+        "date_created": date,
+        "date_modified": date,
+    }
+
+
+def set_post_scores(post: Dict[str, Any]) -> Dict[str, Any]:
+    """Sets the ranking score fields of a post from its counters"""
+    post.update(
+        score_fields(post["likes"], post["dislikes"], post["date_created"])
+    )
+
+    return post
+
+
+def comment_document(
+    id: ObjectId,
+    user_id: str,
+    post_id: str,
+    reply_to_id: Optional[str],
+    content: str,
+    date: datetime,
+) -> Dict[str, Any]:
+    """Builds a comment without reactions or replies yet"""
+    return {
+        "_id": id,
+        "user_id": user_id,
+        "post_id": post_id,
+        "reply_to_id": reply_to_id,
+        "content": content,
+        "likes": 0,
+        "dislikes": 0,
+        "replies": 0,
+        "date_created": date,
+        "date_modified": date,
+    }
+
+
+def reaction_document(
+    id: ObjectId,
+    target_id: str,
+    user_id: str,
+    is_like: bool,
+    date: datetime,
+) -> Dict[str, Any]:
+    """Builds a reaction as stored by the storage"""
+    return {
+        "_id": id,
+        "target_id": target_id,
+        "user_id": user_id,
+        "is_like": is_like,
+        "date_created": date,
+        "date_modified": date,
+    }
+
+
+def build_dataset(spec: DatasetSpec) -> Dataset:
+    """Builds the documents of a dataset"""
+    rng = random.Random(spec.seed)
+    now = datetime.now(UTC)
+    dataset = Dataset()
+
+    def date_between(start: datetime) -> datetime:
+        return start + (now - start) * rng.random()
+
+    start = now - timedelta(days=spec.days)
+    password = get_hash(PASSWORD)
+
+    for i in range(spec.categories):
+        dataset.categories.append(
+            category_document(
+                ObjectId(),
+                f"category-{i}",
+                f"Benchmark category {i}",
+                ["general", "news", "questions"],
+                start,
+            )
+        )
+    category_ids = [str(c["_id"]) for c in dataset.categories]
+
+    for i in range(spec.users):
+        dataset.users.append(
+            user_document(
+                ObjectId(),
+                f"user{i}",
+                f"user{i}@benchmark.local",
+                password,
+                rng.sample(category_ids, min(3, len(category_ids))),
+                start,
+            )
+        )
+    user_ids = [str(u["_id"]) for u in dataset.users]
+
+    for i in range(spec.posts):
+        category = rng.choice(dataset.categories)
+        date = date_between(start)
+        dataset.posts.append(
+            post_document(
+                ObjectId(),
+                rng.choice(user_ids),
+                str(category["_id"]),
+                rng.choice(category["topics"]),
+                f"Benchmark post {i}",
+                "Lorem ipsum dolor sit amet " * rng.randint(1, 20),
+                date,
+            )
+        )
+    posts_comments: Dict[str, List[Dict[str, Any]]] = {}
+    for i in range(spec.comments):
+        post = rng.choice(dataset.posts)
+        post_id = str(post["_id"])
+        siblings = posts_comments.setdefault(post_id, [])
+        reply_to = None
+        if siblings and rng.random() < spec.reply_ratio:
+            reply_to = rng.choice(siblings)
+        date = date_between(
+            reply_to["date_created"] if reply_to else post["date_created"]
+        )
+        comment = comment_document(
+            ObjectId(),
+            rng.choice(user_ids),
+            post_id,
+            str(reply_to["_id"]) if reply_to else None,
+            f"Benchmark comment {i}",
+            date,
+        )
+        siblings.append(comment)
+        dataset.comments.append(comment)
+        post["comments"] += 1
+        if reply_to is not None:
+            reply_to["replies"] += 1
+
+    targets = dataset.posts + dataset.comments
+    pairs = set()
+    for _ in range(spec.reactions):
+        pairs.add((rng.randrange(len(targets)), rng.randrange(len(user_ids))))
+    for target_index, user_index in pairs:
+        target = targets[target_index]
+        is_like = rng.random() < 0.75
+        target["likes" if is_like else "dislikes"] += 1
+        date = date_between(target["date_created"])
+        dataset.reactions.append(
+            reaction_document(
+                ObjectId(),
+                str(target["_id"]),
+                user_ids[user_index],
+                is_like,
+                date,
+            )
+        )
+
+    for post in dataset.posts:
+        set_post_scores(post)
+
+    return dataset
+
+
+async def insert_dataset(db: AsyncIOMotorDatabase, dataset: Dataset) -> None:
+    """Inserts the documents of a dataset in batches"""
+    for collection in [
+        "users",
+        "categories",
+        "posts",
+        "comments",
+        "reactions",
+    ]:
+        documents = getattr(dataset, collection)
+        for i in range(0, len(documents), BATCH_SIZE):
+            await db[collection].insert_many(
+                documents[i : i + BATCH_SIZE], ordered=False
+            )
+
+
+def dataset_counts(dataset: Dataset) -> Dict[str, int]:
+    """Gets the number of documents of each collection"""
+    return {
+        collection: len(getattr(dataset, collection))
+        for collection in Dataset.__dataclass_fields__
+    }
@@ -0,0 +1,508 @@
+"""
+Generates a large synthetic BuzzBoard dataset for scale testing, with
+Zipfian category and topic popularity, heavy tailed post popularity,
+bursty post timestamps and deep reply chains. Documents carry the
+fields the storage writes and their counters agree with the generated
+comments and reactions.
+
+Posts are split into shards generated by parallel processes, each
+streaming its documents in batches, so memory stays flat however
+large the dataset is. Documents are bulk inserted with insert_many,
+or written as NDJSON files that mongoimport can load.
+
+Run from the backend directory with:
+    python -m benchmarks.generate_dataset --posts 1000000 \\
+        --reactions 10000000 --db-name buzz-board-scale --drop
+    python -m benchmarks.generate_dataset --ndjson ./dataset
+
+Create the indexes once loading is done, which is faster than
+maintaining them during the load:
+    DB_NAME=buzz-board-scale python manage.py indexes apply
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_DAYS", "7")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from benchmarks.dataset import (  # noqa: E402
+    PASSWORD,
+    category_document,
+    comment_document,
+    post_document,
+    reaction_document,
+    set_post_scores,
+    user_document,
+)
+from core.authentication.hashing import get_hash  # noqa: E402
+
+COLLECTIONS = ["users", "categories", "posts", "comments", "reactions"]
+
+
+@dataclass
+class GeneratorSpec:
+    users: int = 100000
+    categories: int = 200
+    topics: int = 8
+    posts: int = 1000000
+    comments: int = 5000000
+    reactions: int = 10000000
+    comment_reaction_share: float = 0.2
+    zipf: float = 1.1
+    popularity_alpha: float = 1.5
+    burst_share: float = 0.6
+    bursts_per_day: float = 2.0
+    reply_ratio: float = 0.5
+    reply_chain_ratio: float = 0.3
+    days: int = 90
+    seed: int = 0
+
+
+@dataclass
+class SinkConfig:
+    mongodb_uri: Optional[str]
+    db_name: str
+    ndjson: Optional[str]
+    batch_size: int
+
+
+class MongoSink:
+    """Inserts documents in unordered batches"""
+
+    def __init__(self, config: SinkConfig) -> None:
+        self.client = MongoClient(config.mongodb_uri)
+        self.db = self.client[config.db_name]
+        self.batch_size = config.batch_size
+        self.buffers = {collection: [] for collection in COLLECTIONS}
+
+    def add(self, collection: str, document: Dict[str, Any]) -> None:
+        buffer = self.buffers[collection]
+        buffer.append(document)
+        if len(buffer) >= self.batch_size:
+            self.flush(collection)
+
+    def flush(self, collection: str) -> None:
+        if self.buffers[collection]:
+            self.db[collection].insert_many(
+                self.buffers[collection], ordered=False
+            )
+            self.buffers[collection] = []
+
+    def close(self) -> None:
+        for collection in COLLECTIONS:
+            self.flush(collection)
+        self.client.close()
+
+
+def extended_json(value: Any) -> Dict[str, str]:
+    """
+    Encodes the BSON values of the documents as extended JSON, much
+    faster than json_util which walks every document in Python
+    """
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat(timespec="milliseconds")}
+
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+class NDJSONSink:
+    """Writes documents as extended JSON, one per line"""
+
+    def __init__(self, config: SinkConfig, part: str) -> None:
+        os.makedirs(config.ndjson, exist_ok=True)
+        self.directory = config.ndjson
+        self.part = part
+        self.files = {}
+
+    def add(self, collection: str, document: Dict[str, Any]) -> None:
+        file = self.files.get(collection)
+        if file is None:
+            path = os.path.join(
+                self.directory, f"{collection}.{self.part}.ndjson"
+            )
+            file = self.files[collection] = open(path, "w", 1 << 20)
+        file.write(json.dumps(document, default=extended_json) + "\n")
+
+    def close(self) -> None:
+        for file in self.files.values():
+            file.close()
+
+
+def open_sink(config: SinkConfig, part: str):
+    """Opens the sink the documents are written to"""
+    if config.ndjson:
+        return NDJSONSink(config, part)
+
+    return MongoSink(config)
+
+
+def zipf_cum_weights(count: int, exponent: float) -> List[float]:
+    """Gets the cumulative Zipf weights of count ranks"""
+    return list(
+        itertools.accumulate(
+            1 / rank**exponent for rank in range(1, count + 1)
+        )
+    )
+
+
+def zipf_choice(rng: random.Random, cum_weights: List[float]) -> int:
+    """Picks a rank index with Zipfian probability"""
+    return bisect_left(cum_weights, rng.random() * cum_weights[-1])
+
+
+class Generator:
+    """Generates the documents of one shard of the posts"""
+
+    def __init__(
+        self,
+        spec: GeneratorSpec,
+        rng: random.Random,
+        user_ids: List[str],
+        categories: List[Tuple[str, List[str]]],
+        bursts: List[datetime],
+        now: datetime,
+    ) -> None:
+        self.spec = spec
+        self.rng = rng
+        self.user_ids = user_ids
+        self.categories = categories
+        self.bursts = bursts
+        self.now = now
+        self.start = now - timedelta(days=spec.days)
+        self.category_weights = zipf_cum_weights(len(categories), spec.zipf)
+        self.topic_weights = zipf_cum_weights(spec.topics, spec.zipf)
+
+        # Scales a Pareto draw, whose mean is alpha / (alpha - 1),
+        # so that the per target counts add up to the requested totals
+        alpha = spec.popularity_alpha
+        mean = alpha / (alpha - 1)
+        self.post_reactions = (
+            spec.reactions
+            * (1 - spec.comment_reaction_share)
+            / spec.posts
+            / mean
+        )
+        self.post_comments = spec.comments / spec.posts / mean
+        self.comment_reactions = (
+            spec.reactions
+            * spec.comment_reaction_share
+            / max(spec.comments, 1)
+        )
+
+    def object_id(self, date: datetime) -> ObjectId:
+        """Gets a unique id whose timestamp is the creation date"""
+        return ObjectId(
+            int(date.timestamp()).to_bytes(4, "big")
+            + self.rng.getrandbits(64).to_bytes(8, "big")
+        )
+
+    def count(self, scale: float, popularity: float) -> int:
+        """Draws a count from its mean, rounding stochastically"""
+        return int(scale * popularity + self.rng.random())
+
+    def later(self, date: datetime, mean_hours: float) -> datetime:
+        """Draws a date shortly after another"""
+        delay = timedelta(hours=self.rng.expovariate(1 / mean_hours))
+
+        return min(date + delay, self.now)
+
+    def post_date(self) -> datetime:
+        """Draws a post date, mostly clustered around bursts"""
+        if self.bursts and self.rng.random() < self.spec.burst_share:
+            return self.later(self.rng.choice(self.bursts), 3)
+
+        return self.start + (self.now - self.start) * self.rng.random()
+
+    def reactions(
+        self, sink, target_id: str, date: datetime, count: int
+    ) -> Tuple[int, int]:
+        """
+        Writes the reactions of distinct users to a target
+
+        Returns:
+            The number of likes and dislikes
+        """
+        likes = 0
+        count = min(count, len(self.user_ids))
+        for user_index in self.rng.sample(range(len(self.user_ids)), count):
+            is_like = self.rng.random() < 0.8
+            likes += is_like
+            reaction_date = self.later(date, 12)
+            sink.add(
+                "reactions",
+                reaction_document(
+                    self.object_id(reaction_date),
+                    target_id,
+                    self.user_ids[user_index],
+                    is_like,
+                    reaction_date,
+                ),
+            )
+
+        return likes, count - likes
+
+    def comments(self, sink, post_id: str, date: datetime, count: int) -> None:
+        """Writes the comments of a post, with chains of replies"""
+        comments = []
+        for i in range(count):
+            parent = None
+            draw = self.rng.random()
+            if comments and draw < self.spec.reply_chain_ratio:
+                parent = comments[-1]
+            elif comments and draw < self.spec.reply_ratio:
+                parent = self.rng.choice(comments)
+
+            comment_date = self.later(
+                parent["date_created"] if parent else date, 4
+            )
+            comment = comment_document(
+                self.object_id(comment_date),
+                self.rng.choice(self.user_ids),
+                post_id,
+                str(parent["_id"]) if parent else None,
+                f"Comment {i} " + "lorem ipsum " * (i % 7 + 1),
+                comment_date,
+            )
+            if parent is not None:
+                parent["replies"] += 1
+            comments.append(comment)
+
+        for comment in comments:
+            comment["likes"], comment["dislikes"] = self.reactions(
+                sink,
+                str(comment["_id"]),
+                comment["date_created"],
+                self.count(self.comment_reactions, 1),
+            )
+            sink.add("comments", comment)
+
+    def posts(self, sink, count: int) -> None:
+        """Writes posts with their comments and reactions"""
+        for i in range(count):
+            category_id, topics = self.categories[
+                zipf_choice(self.rng, self.category_weights)
+            ]
+            date = self.post_date()
+            id = self.object_id(date)
+            popularity = self.rng.paretovariate(self.spec.popularity_alpha)
+
+            likes, dislikes = self.reactions(
+                sink,
+                str(id),
+                date,
+                self.count(self.post_reactions, popularity),
+            )
+            comments = self.count(self.post_comments, popularity)
+            self.comments(sink, str(id), date, comments)
+
+            post = post_document(
+                id,
+                self.rng.choice(self.user_ids),
+                category_id,
+                topics[zipf_choice(self.rng, self.topic_weights)],
+                f"Post {i} about {topics[0]}",
+                "Lorem ipsum dolor sit amet " * (i % 20 + 1),
+                date,
+                likes=likes,
+                dislikes=dislikes,
+                comments=comments,
+            )
+            sink.add("posts", set_post_scores(post))
+
+
+def generate_shard(
+    spec: GeneratorSpec,
+    config: SinkConfig,
+    shard: int,
+    count: int,
+    user_ids: List[str],
+    categories: List[Tuple[str, List[str]]],
+    bursts: List[datetime],
+    now: datetime,
+) -> Dict[str, int]:
+    """Generates a shard of the posts in a worker process"""
+    sink = open_sink(config, f"{shard:03d}")
+    counting = CountingSink(sink)
+    generator = Generator(
+        spec,
+        random.Random(f"{spec.seed}-{shard}"),
+        user_ids,
+        categories,
+        bursts,
+        now,
+    )
+    generator.posts(counting, count)
+    sink.close()
+
+    return counting.counts
+
+
+class CountingSink:
+    """Counts the documents written to a sink"""
+
+    def __init__(self, sink) -> None:
+        self.sink = sink
+        self.counts = {collection: 0 for collection in COLLECTIONS}
+
+    def add(self, collection: str, document: Dict[str, Any]) -> None:
+        self.counts[collection] += 1
+        self.sink.add(collection, document)
+
+
+def generate_base(
+    spec: GeneratorSpec, sink: CountingSink, now: datetime
+) -> Tuple[List[str], List[Tuple[str, List[str]]], List[datetime]]:
+    """
+    Writes the users and categories shared by every shard
+
+    Returns:
+        The user ids, the category ids with their topics and the
+        times of the activity bursts
+    """
+    rng = random.Random(spec.seed)
+    start = now - timedelta(days=spec.days)
+    password = get_hash(PASSWORD)
+
+    categories = []
+    for i in range(spec.categories):
+        id = str(ObjectId())
+        topics = [f"topic-{i}-{j}" for j in range(spec.topics)]
+        categories.append((id, topics))
+        sink.add(
+            "categories",
+            category_document(
+                ObjectId(id),
+                f"category-{i}",
+                f"Synthetic category {i}",
+                topics,
+                start,
+            ),
+        )
+
+    category_weights = zipf_cum_weights(spec.categories, spec.zipf)
+    user_ids = []
+    for i in range(spec.users):
+        id = ObjectId()
+        user_ids.append(str(id))
+        subscribed = {
+            categories[zipf_choice(rng, category_weights)][0]
+            for _ in range(rng.randint(0, 6))
+        }
+        date = start + (now - start) * rng.random() / 2
+        sink.add(
+            "users",
+            user_document(
+                id,
+                f"user{i}",
+                f"user{i}@scale.local",
+                password,
+                list(subscribed),
+                date,
+            ),
+        )
+
+    bursts = [
+        start + (now - start) * rng.random()
+        for _ in range(int(spec.days * spec.bursts_per_day))
+    ]
+
+    return user_ids, categories, bursts
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    for name, default in asdict(GeneratorSpec()).items():
+        parser.add_argument(
+            "--" + name.replace("_", "-"), type=type(default), default=default
+        )
+    parser.add_argument(
+        "--mongodb-uri",
+        default=os.environ.get("MONGODB_URI", "mongodb://localhost:27017"),
+    )
+    parser.add_argument("--db-name", default="buzz-board-scale")
+    parser.add_argument(
+        "--ndjson", help="write NDJSON files to this directory instead"
+    )
+    parser.add_argument("--drop", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    spec = GeneratorSpec(
+        **{name: getattr(args, name) for name in asdict(GeneratorSpec())}
+    )
+    config = SinkConfig(
+        mongodb_uri=args.mongodb_uri,
+        db_name=args.db_name,
+        ndjson=args.ndjson,
+        batch_size=args.batch_size,
+    )
+
+    if args.drop and not args.ndjson:
+        MongoClient(args.mongodb_uri).drop_database(args.db_name)
+
+    started = time.perf_counter()
+    now = datetime.now(UTC)
+
+    sink = CountingSink(open_sink(config, "base"))
+    user_ids, categories, bursts = generate_base(spec, sink, now)
+    sink.sink.close()
+    counts = sink.counts
+
+    processes = max(1, min(args.processes, spec.posts))
+    shards = [
+        spec.posts // processes + (shard < spec.posts % processes)
+        for shard in range(processes)
+    ]
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [
+            executor.submit(
+                generate_shard,
+                spec,
+                config,
+                shard,
+                count,
+                user_ids,
+                categories,
+                bursts,
+                now,
+            )
+            for shard, count in enumerate(shards)
+        ]
+        for future in futures:
+            for collection, count in future.result().items():
+                counts[collection] += count
+
+    elapsed = time.perf_counter() - started
+    for collection, count in counts.items():
+        print(f"{collection:>10}: {count:>12,}")
+    total = sum(counts.values())
+    print(
+        f"{total:,} documents in {elapsed:.1f} s"
+        f" ({total / elapsed:,.0f} per second)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import json
 from typing import List
 
 from fastapi import Depends, HTTPException, status
@@ -8,33 +7,34 @@ from core.authentication.auth_token import (
     credentials_exception,
     verify_access_token,
 )
-from core.authentication.hashing import hash_verify
+from core.authentication.hashing import hash_verify_async
+from core.authentication.user_cache import user_cache
 from core.storage import storage
 from schemas.token import TokenData
 from schemas.user import User, UserStatus
+from services.decoding import decode
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
 
-def get_user(email: str) -> User:
+async def get_user(email: str) -> User:
     """
     Gets a user from the db storage using their email
     """
     users = storage.db["users"]
 
-    user = users.find_one({"email": email})
+    user = await users.find_one({"email": email})
     if user is None:
         return None
-    user_data = json.loads(json.dumps(user, default=str))
 
-    return user_data
+    return decode(User, user)
 
 
-def authenticate_user(email: str, password: str) -> User:
-    user = storage.verify_user_record({"email": email})
+async def authenticate_user(email: str, password: str) -> User:
+    user = await storage.verify_user_record({"email": email})
 
     # print(user)
-    if not hash_verify(password, user.password):
+    if not await hash_verify_async(password, user.password):
         # return False
         raise credentials_exception
     # if "password" in user:
@@ -42,7 +42,7 @@ def authenticate_user(email: str, password: str) -> User:
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """
     Gets the current user.
 
@@ -60,10 +60,17 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
             detail="Invalid token type",
         )
 
-    user = storage.get_user_record({"email": tokenData.email})
+    user = user_cache.get(tokenData.email)
 
     if user is None:
-        raise credentials_exception
+        # Read first so a record changed during the load is not cached
+        version = user_cache.version(tokenData.email)
+        user = await storage.get_user_record({"email": tokenData.email})
+
+        if user is None:
+            raise credentials_exception
+
+        user_cache.set(tokenData.email, user, version=version)
 
     # if "password" in user:
     #     del user["password"]
@@ -71,7 +78,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     return user
 
 
-def get_current_active_user(user: User = Depends(get_current_user)):
+async def get_current_active_user(user: User = Depends(get_current_user)):
     """
     Gets the current user and verifies if
     their account is active
@@ -86,7 +93,7 @@ def get_current_active_user(user: User = Depends(get_current_user)):
     return user
 
 
-def get_current_admin_user(user: User = Depends(get_current_user)):
+async def get_current_admin_user(user: User = Depends(get_current_user)):
     """
     Gets the current user and verifies if
     their account is an admin
@@ -1,3 +1,5 @@
+import hashlib
+import time
 from datetime import UTC, datetime, timedelta
 from typing import Any, Dict, Union
 
@@ -5,6 +7,7 @@ from dotenv import load_dotenv
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 
+from core.cache import TTLCache
 from core.config import settings
 from schemas.token import TokenData
 
@@ -17,6 +20,12 @@ credentials_exception = HTTPException(
     headers={"WWW-Authenticate": "Bearer"},
 )
 
+# Decoded tokens by digest, so that clients reusing a bearer token
+# skip the signature verification. Entries never outlive the token.
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
 
 def create_access_token(
     data: Dict[str, Any], expires_delta: Union[timedelta, None] = None
@@ -57,6 +66,11 @@ def verify_access_token(token: str) -> TokenData:
     Returns:
         TokenData object containing the data in the token
     """
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
+
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -69,6 +83,14 @@ def verify_access_token(token: str) -> TokenData:
         if email is None or id is None:
             raise credentials_exception
 
-        return TokenData(email=email, id=id, type=token_type)
+        token_data = TokenData(email=email, id=id, type=token_type)
     except JWTError:
         raise credentials_exception
+
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        token_cache.set(
+            key, token_data, min(expires_in, settings.TOKEN_CACHE_TTL_SECONDS)
+        )
+
+    return token_data
@@ -1,5 +1,12 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
+from core.config import settings
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -9,3 +16,64 @@ def get_hash(data: str) -> str:
 
 def hash_verify(plain_text: str, hashed_text: str) -> bool:
     return pwd_context.verify(plain_text, hashed_text)
+
+
+class HashingPool:
+    """
+    Runs password hashing in a dedicated, bounded thread pool so that
+    bcrypt work never blocks the event loop. Once max_pending calls are
+    in flight further calls are rejected instead of queued, so a burst
+    of logins only degrades login latency.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hashing"
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a free worker"""
+        return max(self.pending - self.workers, 0)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs a hashing function in the pool"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy. Try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """Gets the pool usage counts"""
+        return {
+            "pending": self.pending,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+        }
+
+
+hashing_pool = HashingPool(
+    workers=settings.HASH_WORKERS, max_pending=settings.HASH_MAX_PENDING
+)
+
+
+async def get_hash_async(data: str) -> str:
+    return await hashing_pool.run(get_hash, data)
+
+
+async def hash_verify_async(plain_text: str, hashed_text: str) -> bool:
+    return await hashing_pool.run(hash_verify, plain_text, hashed_text)
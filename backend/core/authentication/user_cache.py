@@ -0,0 +1,9 @@
+from core.cache import TTLCache
+from core.config import settings
+
+# Authenticated users by email. Entries are dropped by the storage
+# whenever the user record changes. Other worker processes only see
+# the change once their own entry expires.
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
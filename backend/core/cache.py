@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Bounded in-process cache. Entries expire after their time to live
+    and the least recently used entry is evicted when the cache is full.
+    Meant to be used from the event loop thread only.
+
+    Every key has a version that changes whenever it is popped or the
+    cache is cleared. A value loaded after a miss is set with the
+    version read before loading it, so a value that was invalidated
+    while it loaded is not cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Pop counts per key, reset by bumping the epoch when too many
+        # keys were popped or the cache is cleared
+        self._versions: Dict[Hashable, int] = {}
+        self._epoch = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Gets a cached value, counting the lookup as a hit or a miss"""
+        entry = self._data.get(key)
+
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+
+        return entry[1]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Gets a cached value without counting the lookup or marking the
+        entry as recently used
+        """
+        entry = self._data.get(key)
+
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+
+        return entry[1]
+
+    def version(self, key: Hashable) -> Tuple[int, int]:
+        """Gets the version of a key, to be passed to set after a load"""
+        return self._epoch, self._versions.get(key, 0)
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        version: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """
+        Caches a value for ttl seconds or the default time to live,
+        unless the key changed version since version was read
+        """
+        if self.maxsize <= 0:
+            return
+        if version is not None and version != self.version(key):
+            return
+
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        """Removes a cached value and invalidates loads in progress"""
+        self._data.pop(key, None)
+        self._versions[key] = self._versions.get(key, 0) + 1
+        if len(self._versions) > self.maxsize:
+            self._versions.clear()
+            self._epoch += 1
+
+    def clear(self) -> None:
+        """Removes every cached value and invalidates loads in progress"""
+        self._data.clear()
+        self._versions.clear()
+        self._epoch += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Gets the cache hit, miss and eviction counts"""
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
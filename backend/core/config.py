@@ -1,7 +1,7 @@
 import logging
 import logging.handlers
 import os
-from typing import Any, List
+from typing import Any, List, Optional
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -52,6 +52,55 @@ class Settings(BaseSettings):
     ALGORITHM: str = os.getenv("ALGORITHM")
     ACCESS_TOKEN_EXPIRE_DAYS: str = os.getenv("ACCESS_TOKEN_EXPIRE_DAYS")
     MONGO_DB_URI: str = os.getenv("MONGODB_URI")
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 30
+    HASH_WORKERS: int = 2
+    HASH_MAX_PENDING: int = 64
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: float = 300
+    FEED_CACHE_URL: Optional[str] = None
+    FEED_CACHE_SIZE: int = 1000
+    FEED_CACHE_PAGES: int = 3
+    FEED_CACHE_TTL_SECONDS: float = 60
+    FEED_CACHE_HOT_TTL_SECONDS: float = 15
+    MEDIA_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    MAX_REQUEST_BODY_BYTES: int = 11 * 1024 * 1024
+    IMAGE_WORKERS: int = 2
+    EMAIL_ACCOUNT: Optional[str] = None
+    EMAIL_PASSWORD: Optional[str] = None
+    SMTP_HOST: Optional[str] = None
+    SMTP_PORT: int = 465
+    SMTP_USE_SSL: bool = True
+    SMTP_TIMEOUT_SECONDS: float = 30
+    SMTP_IDLE_SECONDS: float = 60
+    MAIL_WORKER_ENABLED: bool = True
+    MAIL_BATCH_SIZE: int = 20
+    MAIL_POLL_SECONDS: float = 5
+    MAIL_LEASE_SECONDS: float = 300
+    MAIL_MAX_ATTEMPTS: int = 8
+    MAIL_RETRY_BASE_SECONDS: float = 30
+    MAIL_RETRY_MAX_SECONDS: float = 3600
+    TIMELINE_SIZE: int = 500
+    TIMELINE_MAX_LISTS: int = 1000
+    TIMELINE_TTL_SECONDS: float = 300
+    PAGE_SIZE_MAX: int = 100
+    BATCH_MAX_IDS: int = 100
+    COMMENT_TREE_MAX_DEPTH: int = 5
+    COMMENT_TREE_MAX_BREADTH: int = 50
+    # Replies nested under one top level comment of a tree, which at
+    # 16 MB per result document leaves about 8 KB per comment
+    COMMENT_TREE_MAX_NODES: int = 2000
+    REACTION_LOOKUP_MAX_TARGETS: int = 100
+    REACTION_WRITE_BEHIND: bool = False
+    REACTION_FLUSH_SECONDS: float = 0.25
+    REACTION_TARGET_CACHE_SIZE: int = 10000
+    REACTION_TARGET_CACHE_TTL_SECONDS: float = 300
+    METRICS_ENABLED: bool = True
+    QUERY_MONITOR_ENABLED: bool = True
+    SLOW_QUERY_MS: float = 100
+    SLOW_QUERY_EXPLAIN: bool = True
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = 300
+    SLOW_QUERY_EXPLAIN_MAX_PER_MINUTE: int = 10
 
     def __init__(self, **values: Any):
         super().__init__(**values)
@@ -0,0 +1,292 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Formats a label set in the Prometheus text format"""
+    if not names:
+        return ""
+
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """A monotonically increasing count per label set"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(self.labels, labels)} {value}"
+            for labels, value in list(self.values.items())
+        ]
+
+
+class Histogram:
+    """Counts observations per label set into cumulative buckets"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: the count of each bucket, then the sum
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        names = self.labels + ("le",)
+
+        for labels, counts in list(self.values.items()):
+            total = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                total += count
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{format_labels(names, labels + (bound,))} {total}"
+                )
+            label_text = format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_text} {counts[-1]}")
+            lines.append(f"{self.name}_count{label_text} {total}")
+
+        return lines
+
+
+class Registry:
+    """
+    Holds the metrics of the worker process and renders them in the
+    Prometheus text format. Every worker process exposes its own
+    metrics, so scrape each worker or aggregate by instance.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: List = []
+        self.collectors: List[Tuple[str, str, Callable[[], Dict]]] = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def add_stats(
+        self, prefix: str, help: str, stats: Callable[[], Dict]
+    ) -> None:
+        """Exposes each value returned by stats as a gauge"""
+        self.collectors.append((prefix, help, stats))
+
+    def render(self) -> str:
+        lines = []
+
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+
+        for prefix, help, stats in self.collectors:
+            for key, value in stats().items():
+                name = f"{prefix}_{key}"
+                lines.append(f"# HELP {name} {help} {key}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "buzzboard_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    labels=("method", "route", "status"),
+)
+http_mongo_commands = registry.counter(
+    "buzzboard_http_mongo_commands_total",
+    "Mongo commands sent while handling requests by route template",
+    labels=("method", "route"),
+)
+storage_call_duration = registry.histogram(
+    "buzzboard_storage_call_duration_seconds",
+    "Storage method latency",
+    labels=("method",),
+)
+storage_mongo_commands = registry.counter(
+    "buzzboard_storage_mongo_commands_total",
+    "Mongo commands sent by storage methods, nested calls included",
+    labels=("method",),
+)
+mongo_commands = registry.counter(
+    "buzzboard_mongo_commands_total",
+    "Mongo commands sent by the worker",
+    labels=("command",),
+)
+
+
+class CommandCount:
+    """Number of Mongo commands sent within a request or storage call"""
+
+    __slots__ = ["count"]
+
+    def __init__(self) -> None:
+        self.count = 0
+
+
+# Count of the innermost request or storage call in progress. The
+# driver runs commands on executor threads with a copy of the calling
+# context, so the listener sees the count of the call it serves.
+command_count: ContextVar[Optional[CommandCount]] = ContextVar(
+    "command_count", default=None
+)
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Counts the Mongo commands sent, in total and per call"""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        mongo_commands.inc((event.command_name,))
+        count = command_count.get()
+        if count is not None:
+            count.count += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+def timed(name: str):
+    """
+    Records the latency and the Mongo commands of every call of a
+    coroutine function, including those of the calls it makes
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            parent = command_count.get()
+            count = CommandCount()
+            token = command_count.set(count)
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                storage_call_duration.observe(
+                    (name,), time.perf_counter() - start
+                )
+                command_count.reset(token)
+                storage_mongo_commands.inc((name,), count.count)
+                if parent is not None:
+                    parent.count += count.count
+
+        return wrapper
+
+    return decorator
+
+
+def instrument(cls):
+    """Times every public coroutine method of a class"""
+    for name, member in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(member):
+            setattr(cls, name, timed(name)(member))
+
+    return cls
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and Mongo commands of every HTTP request by
+    method, route template and status. Requests matching no route
+    share one label so unknown paths cannot inflate the series.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        count = CommandCount()
+        token = command_count.set(count)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            command_count.reset(token)
+
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_request_duration.observe((method, path, str(status)), elapsed)
+            http_mongo_commands.inc((method, path), count.count)
@@ -0,0 +1,350 @@
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from logging import getLogger
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import settings
+from core.metrics import LATENCY_BUCKETS, registry
+from fastapi import Request
+from pymongo import MongoClient, monitoring
+
+# Commands sent by the storage, as opposed to handshakes and admin
+MONITORED_COMMANDS = {
+    "aggregate",
+    "count",
+    "delete",
+    "distinct",
+    "find",
+    "findAndModify",
+    "getMore",
+    "insert",
+    "update",
+}
+EXPLAINABLE_COMMANDS = {
+    "aggregate",
+    "count",
+    "delete",
+    "distinct",
+    "find",
+    "findAndModify",
+    "update",
+}
+
+# Fields added by the driver that explain does not accept
+DRIVER_FIELDS = {
+    "$clusterTime",
+    "$db",
+    "$readPreference",
+    "apiDeprecationErrors",
+    "apiStrict",
+    "apiVersion",
+    "autocommit",
+    "lsid",
+    "readConcern",
+    "startTransaction",
+    "txnNumber",
+    "writeConcern",
+}
+
+command_duration = registry.histogram(
+    "buzzboard_mongo_command_duration_seconds",
+    "Mongo command latency by collection",
+    labels=("command", "collection"),
+    buckets=LATENCY_BUCKETS,
+)
+documents_returned = registry.counter(
+    "buzzboard_mongo_documents_returned_total",
+    "Documents returned or written by Mongo commands",
+    labels=("command", "collection"),
+)
+slow_commands = registry.counter(
+    "buzzboard_mongo_slow_commands_total",
+    "Mongo commands over the slow query threshold by route",
+    labels=("command", "collection", "route"),
+)
+documents_examined = registry.counter(
+    "buzzboard_mongo_explained_documents_examined_total",
+    "Documents examined by explained slow commands by route",
+    labels=("command", "collection", "route"),
+)
+
+# Method and route template of the request being handled
+current_route: ContextVar[Optional[str]] = ContextVar(
+    "current_route", default=None
+)
+
+
+async def track_route(request: Request) -> None:
+    """Makes the route of the request known to the command listener"""
+    route = request.scope.get("route")
+    if route is not None:
+        current_route.set(f"{request.method} {route.path}")
+
+
+def command_collection(command_name: str, command: Dict) -> str:
+    """Gets the collection a command runs against"""
+    if command_name == "getMore":
+        return str(command.get("collection", ""))
+
+    collection = command.get(command_name)
+    return collection if isinstance(collection, str) else ""
+
+
+def reply_documents(command_name: str, reply: Dict) -> int:
+    """Counts the documents returned or written by a command"""
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    if command_name == "findAndModify":
+        return 0 if reply.get("value") is None else 1
+    if command_name == "distinct":
+        return len(reply.get("values", ()))
+
+    return int(reply.get("n", 0))
+
+
+def redact(value: Any) -> Any:
+    """Replaces the literal values of a command with their type name"""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+
+    return type(value).__name__
+
+
+def plan_summary(explain: Dict) -> Dict[str, Any]:
+    """
+    Gets the execution stats and the stages of the winning plan from
+    an explain output, which nests them differently per command
+    """
+    summary = {"stages": []}
+
+    def walk(value: Any, in_plan: bool) -> None:
+        if isinstance(value, dict):
+            stats = value.get("executionStats")
+            if isinstance(stats, dict) and "nReturned" not in summary:
+                summary["nReturned"] = stats.get("nReturned")
+                summary["totalDocsExamined"] = stats.get("totalDocsExamined")
+                summary["totalKeysExamined"] = stats.get("totalKeysExamined")
+            stage = value.get("stage")
+            if in_plan and isinstance(stage, str):
+                if stage not in summary["stages"]:
+                    summary["stages"].append(stage)
+            for key, item in value.items():
+                if key in ("executionStats", "allPlansExecution"):
+                    continue
+                walk(item, in_plan or key in ("winningPlan", "queryPlan"))
+        elif isinstance(value, list):
+            for item in value:
+                walk(item, in_plan)
+
+    walk(explain, False)
+
+    return summary
+
+
+class ExplainCapture:
+    """
+    Explains slow commands on a background thread with its own client,
+    so neither the event loop nor the driver threads wait for it.
+    Each command shape is explained at most once per interval and at
+    most max_per_minute commands are explained in total.
+    """
+
+    def __init__(self, uri: str, interval: float, max_per_minute: int) -> None:
+        self.uri = uri
+        self.interval = interval
+        self.max_per_minute = max_per_minute
+        self.logger = getLogger(__name__ + ".ExplainCapture")
+        self.queue: "queue.Queue[Tuple]" = queue.Queue(maxsize=100)
+        self.last_explained: Dict[str, float] = {}
+        self.window_start = 0.0
+        self.window_count = 0
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.client: Optional[MongoClient] = None
+
+    def allow(self, shape: str) -> bool:
+        """Applies the per shape and the global rate limits"""
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_explained.get(shape, -self.interval) < (
+                self.interval
+            ):
+                return False
+            if now - self.window_start >= 60:
+                self.window_start = now
+                self.window_count = 0
+            if self.window_count >= self.max_per_minute:
+                return False
+
+            self.window_count += 1
+            if len(self.last_explained) >= 1000:
+                self.last_explained.clear()
+            self.last_explained[shape] = now
+
+        return True
+
+    def submit(self, shape: str, item: Tuple) -> bool:
+        """Queues a slow command to be explained if the limits allow"""
+        if not self.allow(shape):
+            return False
+
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            return False
+
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="explain", daemon=True
+                )
+                self.thread.start()
+
+        return True
+
+    def explain(self, database: str, command: Dict) -> Dict:
+        """Runs explain for a command with execution stats"""
+        if self.client is None:
+            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
+        explained = {
+            key: value
+            for key, value in command.items()
+            if key not in DRIVER_FIELDS
+        }
+
+        return self.client[database].command(
+            {"explain": explained, "verbosity": "executionStats"}
+        )
+
+    def run(self) -> None:
+        """Explains queued commands and logs their plans"""
+        while True:
+            database, command_name, command, message, labels = self.queue.get()
+            try:
+                summary = plan_summary(self.explain(database, command))
+            except Exception as ex:
+                self.logger.warning(f"{message} (explain failed: {ex})")
+                continue
+
+            if summary.get("totalDocsExamined") is not None:
+                documents_examined.inc(labels, summary["totalDocsExamined"])
+            stages = ",".join(summary["stages"]) or "unknown"
+            log = (
+                self.logger.warning
+                if "COLLSCAN" in summary["stages"]
+                else self.logger.info
+            )
+            log(
+                f"{message} plan={stages}"
+                f" returned={summary.get('nReturned')}"
+                f" docs_examined={summary.get('totalDocsExamined')}"
+                f" keys_examined={summary.get('totalKeysExamined')}"
+            )
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    Records the duration and documents returned of every storage
+    command, and logs the commands slower than threshold_ms with the
+    route that sent them and, when enabled, their explain plan
+    """
+
+    def __init__(
+        self, threshold_ms: float, capture: Optional[ExplainCapture]
+    ) -> None:
+        self.threshold_micros = threshold_ms * 1000
+        self.capture = capture
+        self.logger = getLogger(__name__ + ".SlowQueryListener")
+        self.pending: Dict[Tuple, Tuple] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in MONITORED_COMMANDS:
+            return
+
+        self.pending[(event.connection_id, event.request_id)] = (
+            event.command,
+            event.database_name,
+            current_route.get() or "background",
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        started = self.pending.pop(
+            (event.connection_id, event.request_id), None
+        )
+        if started is None:
+            return
+
+        command, database, route = started
+        command_name = event.command_name
+        collection = command_collection(command_name, command)
+        labels = (command_name, collection)
+        command_duration.observe(labels, event.duration_micros / 1e6)
+        documents_returned.inc(
+            labels, reply_documents(command_name, event.reply)
+        )
+
+        if event.duration_micros >= self.threshold_micros:
+            self.slow(event, command, database, route, collection)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self.pending.pop((event.connection_id, event.request_id), None)
+
+    def slow(
+        self,
+        event: monitoring.CommandSucceededEvent,
+        command: Dict,
+        database: str,
+        route: str,
+        collection: str,
+    ) -> None:
+        """Logs a slow command and queues it to be explained"""
+        command_name = event.command_name
+        labels = (command_name, collection, route)
+        slow_commands.inc(labels)
+
+        shape = {
+            key: value if key == command_name else redact(value)
+            for key, value in command.items()
+            if key not in DRIVER_FIELDS
+        }
+        message = (
+            f"Slow mongo command {command_name} on {database}.{collection}"
+            f" took {event.duration_micros / 1000:.1f} ms"
+            f" route={route} shape={shape}"
+        )
+
+        explainable = (
+            self.capture is not None
+            and command_name in EXPLAINABLE_COMMANDS
+            and len(command.get("updates", command.get("deletes", [1]))) == 1
+            and not any(
+                "$out" in stage or "$merge" in stage
+                for stage in command.get("pipeline", ())
+            )
+        )
+        if not explainable or not self.capture.submit(
+            f"{route}:{database}:{shape}",
+            (database, command_name, command, message, labels),
+        ):
+            self.logger.warning(message)
+
+
+def create_query_listener() -> Optional[SlowQueryListener]:
+    """Creates the command listener configured in the settings"""
+    if not settings.QUERY_MONITOR_ENABLED:
+        return None
+
+    capture = None
+    if settings.SLOW_QUERY_EXPLAIN:
+        capture = ExplainCapture(
+            settings.MONGO_DB_URI,
+            interval=settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+            max_per_minute=settings.SLOW_QUERY_EXPLAIN_MAX_PER_MINUTE,
+        )
+
+    return SlowQueryListener(settings.SLOW_QUERY_MS, capture)
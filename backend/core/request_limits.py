@@ -0,0 +1,68 @@
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects requests whose body is larger than max_body_bytes with a
+    413 before the body is parsed. Requests declaring a larger
+    Content-Length are rejected without reading the body. Chunked
+    bodies are counted as they arrive, and once over the limit the app
+    sees the client as disconnected so it stops reading.
+    """
+
+    def __init__(self, app, max_body_bytes: int) -> None:
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    def too_large(self) -> JSONResponse:
+        return JSONResponse(
+            {
+                "detail": "Request body too large. Maximum size is "
+                + f"{self.max_body_bytes} bytes"
+            },
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if (
+            content_length.isdigit()
+            and int(content_length) > self.max_body_bytes
+        ):
+            return await self.too_large()(scope, receive, send)
+
+        received = 0
+        rejected = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    rejected = True
+                    if not started:
+                        await self.too_large()(scope, receive, send)
+                    return {"type": "http.disconnect"}
+
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            # The rejection has already been answered
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
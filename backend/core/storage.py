@@ -1,3 +1,3 @@
-from services.mongo_storage import MongoStorage
+from services.mongo_storage import AsyncMongoStorage
 
-storage = MongoStorage()
+storage = AsyncMongoStorage()
@@ -0,0 +1,17 @@
+import asyncio
+from logging import getLogger
+from typing import Awaitable, Callable
+
+
+async def run_periodically(
+    name: str, interval: float, job: Callable[[], Awaitable]
+):
+    """Runs a background job every interval seconds until cancelled"""
+    logger = getLogger(__name__ + "." + name)
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except Exception as ex:
+            logger.error(ex)
@@ -1,23 +1,84 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from api.v1.routers import (
     categories,
     comments,
     login,
+    media,
     posts,
     reactions,
     register,
+    search,
     users,
 )
 from bson.errors import InvalidId
+from core.authentication.auth_token import token_cache
+from core.authentication.hashing import hashing_pool
+from core.authentication.user_cache import user_cache
 from core.config import settings
-from fastapi import FastAPI, status
+from core.metrics import MetricsMiddleware, registry
+from core.query_monitor import track_route
+from core.request_limits import BodySizeLimitMiddleware
+from core.storage import storage
+from core.tasks import run_periodically
+from fastapi import Depends, FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+)
+from services.counter_buffer import counter_buffer, reaction_targets
+from services.image_variants import (
+    shutdown_executor as shutdown_image_executor,
+)
+from services.mail_outbox import mail_outbox
+from services.timeline import timelines
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepares the db storage on startup and releases it on shutdown"""
+    await storage.create_indexes()
+    await storage.refresh_post_scores({"hot_score": {"$exists": False}})
 
-app = FastAPI(title=settings.APP_NAME, version=settings.RELEASE_ID)
+    tasks = []
+    if settings.REACTION_WRITE_BEHIND:
+        tasks.append(
+            asyncio.create_task(
+                run_periodically(
+                    "flush_reaction_counters",
+                    settings.REACTION_FLUSH_SECONDS,
+                    storage.flush_reaction_counters,
+                )
+            )
+        )
+    if settings.MAIL_WORKER_ENABLED:
+        tasks.append(asyncio.create_task(mail_outbox.run()))
 
-app.mount("/api/v1/media", StaticFiles(directory="media"), name="static")
+    yield
+
+    for task in tasks:
+        task.cancel()
+    # Lets a cancelled flush buffer its deltas again before the last one
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await storage.flush_reaction_counters()
+    shutdown_image_executor()
+    storage.client.close()
+
+
+app = FastAPI(
+    title=settings.APP_NAME,
+    version=settings.RELEASE_ID,
+    lifespan=lifespan,
+    dependencies=[Depends(track_route)],
+)
 
+# Added first so CORS wraps it and its 413s carry CORS headers
+app.add_middleware(
+    BodySizeLimitMiddleware, max_body_bytes=settings.MAX_REQUEST_BODY_BYTES
+)
 app.add_middleware(
     CORSMiddleware,
     allow_methods=["*"],
@@ -26,6 +87,31 @@ app.add_middleware(
     allow_origins=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    registry.add_stats("buzzboard_user_cache", "User cache", user_cache.stats)
+    registry.add_stats(
+        "buzzboard_token_cache", "Token cache", token_cache.stats
+    )
+    registry.add_stats(
+        "buzzboard_reaction_target_cache",
+        "Reaction target cache",
+        reaction_targets.stats,
+    )
+    registry.add_stats(
+        "buzzboard_timeline_cache",
+        "Feed timeline cache",
+        timelines.lists.stats,
+    )
+    registry.add_stats(
+        "buzzboard_hashing_pool", "Password hashing pool", hashing_pool.stats
+    )
+    registry.add_stats(
+        "buzzboard_reaction_buffer",
+        "Reaction counter buffer",
+        lambda: {"pending": len(counter_buffer)},
+    )
+
 app.include_router(
     register.router, prefix=settings.API_V1_STR, tags=["register"]
 )
@@ -45,6 +131,10 @@ app.include_router(
     reactions.router, prefix=settings.API_V1_STR, tags=["reactions"]
 )
 
+app.include_router(media.router, prefix=settings.API_V1_STR, tags=["media"])
+
+app.include_router(search.router, prefix=settings.API_V1_STR, tags=["search"])
+
 
 @app.get(path="/", include_in_schema=False)
 def redirect_docs() -> RedirectResponse:
@@ -52,6 +142,19 @@ def redirect_docs() -> RedirectResponse:
     return RedirectResponse("/docs")
 
 
+@app.get(path="/metrics", include_in_schema=False)
+def get_metrics() -> PlainTextResponse:
+    """Exposes the worker metrics in the Prometheus text format"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Not Found"
+        )
+
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.exception_handler(InvalidId)
 def invalid_id_handler(request, exc):
     message = {"message": "Invalid Object Id"}
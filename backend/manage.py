@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import sys
+
+from core.storage import storage
+from services.indexes import apply_indexes, audit_indexes
+from services.mail_outbox import mail_outbox
+from services.media import prune_media
+
+
+async def indexes(args: argparse.Namespace) -> int:
+    """Applies or checks the declared collection indexes"""
+    if args.action == "apply":
+        failed = await apply_indexes(storage.db)
+        for name in failed:
+            print(f"failed: {name}")
+        if failed:
+            return 1
+
+    report = await audit_indexes(storage.db)
+    status = 0
+    for collection, findings in report.items():
+        for kind, names in findings.items():
+            for name in names:
+                print(f"{collection}: {kind} index {name}")
+        if findings["missing"]:
+            status = 1
+
+    return status
+
+
+async def counters(args: argparse.Namespace) -> int:
+    """Recounts the comment and reply counters"""
+    fixed = await storage.backfill_comment_counters()
+    for collection, count in fixed.items():
+        print(f"{collection}: fixed {count}")
+
+    return 0
+
+
+async def scores(args: argparse.Namespace) -> int:
+    """Recomputes the score fields of every post"""
+    fixed = await storage.refresh_post_scores()
+    print(f"posts: fixed {fixed}")
+
+    return 0
+
+
+async def media(args: argparse.Namespace) -> int:
+    """Removes the media files no post refers to"""
+    urls = await storage.get_post_image_urls()
+    referenced = {url.rsplit("/", 1)[-1] for url in urls}
+    removed = prune_media(referenced, args.older_than)
+    for filename in removed:
+        print(f"removed: {filename}")
+
+    return 0
+
+
+async def mail(args: argparse.Namespace) -> int:
+    """Runs the mail worker in the foreground"""
+    await mail_outbox.run()
+
+    return 0
+
+
+def main() -> int:
+    """Runs the BuzzBoard management commands"""
+    parser = argparse.ArgumentParser(description="BuzzBoard management")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_indexes = commands.add_parser(
+        "indexes", help="apply or check the declared collection indexes"
+    )
+    parser_indexes.add_argument("action", choices=["apply", "check"])
+    parser_indexes.set_defaults(handler=indexes)
+
+    parser_counters = commands.add_parser(
+        "counters", help="recount the comment and reply counters"
+    )
+    parser_counters.add_argument("action", choices=["backfill"])
+    parser_counters.set_defaults(handler=counters)
+
+    parser_scores = commands.add_parser(
+        "scores", help="recompute the post score fields"
+    )
+    parser_scores.add_argument("action", choices=["refresh"])
+    parser_scores.set_defaults(handler=scores)
+
+    parser_media = commands.add_parser(
+        "media", help="remove the media files no post refers to"
+    )
+    parser_media.add_argument("action", choices=["prune"])
+    parser_media.add_argument(
+        "--older-than",
+        type=float,
+        default=24 * 3600,
+        help="only remove files older than this many seconds",
+    )
+    parser_media.set_defaults(handler=media)
+
+    parser_mail = commands.add_parser(
+        "mail", help="send queued emails until interrupted"
+    )
+    parser_mail.add_argument("action", choices=["run"])
+    parser_mail.set_defaults(handler=mail)
+
+    args = parser.parse_args()
+
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -12,10 +12,16 @@ class Comment(BaseModel):
     content: str
     likes: int
     dislikes: int
+    replies: int = 0
     date_created: datetime
     date_modified: datetime
 
 
+class CommentNode(Comment):
+    children: List["CommentNode"] = []
+    next_cursor: Optional[str] = None
+
+
 class CommentIn(BaseModel):
     reply_to_id: Optional[str] = None
     content: str
@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import BaseModel
 
@@ -19,9 +19,12 @@ class Post(BaseModel):
     title: str
     content: str
     post_image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, str]] = None
     likes: int
     dislikes: int
     comments: int
+    net_votes: int = 0
+    hot_score: float = 0.0
     date_created: datetime
     date_modified: datetime
 
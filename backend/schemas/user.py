@@ -44,3 +44,9 @@ class UserOut(BaseModel):
     status: UserStatus
     date_created: datetime
     date_modified: datetime
+
+
+class UserPublic(BaseModel):
+    id: str
+    username: str
+    date_created: datetime
@@ -0,0 +1,59 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from core.config import settings
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+
+async def find_by_ids(
+    collection: AsyncIOMotorCollection,
+    ids: List[str],
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Gets the documents with the given ids with a single query
+
+    Args:
+        collection: the collection to query
+        ids: the requested ids, possibly repeated
+        projection: the fields to return
+
+    Returns:
+        The documents in the order their ids were first requested
+        and the ids that are invalid or have no document
+
+    Raises:
+        HTTPException if more than BATCH_MAX_IDS ids are requested
+    """
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many ids. Maximum is {settings.BATCH_MAX_IDS}",
+        )
+
+    # Ids are matched in their canonical form, so any spelling of an
+    # ObjectId finds its document
+    keys = {}
+    object_ids = {}
+    for id in ids:
+        try:
+            object_id = ObjectId(id)
+        except (InvalidId, TypeError):
+            continue
+        keys[id] = str(object_id)
+        object_ids[keys[id]] = object_id
+
+    documents = {
+        str(document["_id"]): document
+        async for document in collection.find(
+            {"_id": {"$in": list(object_ids.values())}}, projection
+        )
+    }
+
+    found = [documents[key] for key in object_ids if key in documents]
+    missing = [id for id in ids if keys.get(id) not in documents]
+
+    return found, missing
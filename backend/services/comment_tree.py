@@ -0,0 +1,147 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from motor.motor_asyncio import AsyncIOMotorCollection
+from services.decoding import decode_document
+from services.pagination import encode_cursor, keyset_filter
+
+# Replies are listed newest first like get_comments, so the
+# cursors of a tree level also work with the flat listing
+TREE_SORT_FIELD = "date_created"
+TREE_SORT = {TREE_SORT_FIELD: -1, "_id": -1}
+
+
+def reply_breadths(breadth: int, levels: int, max_nodes: int) -> List[int]:
+    """
+    Gets the breadth of each level of replies below a top level
+    comment, keeping the replies nested in one result document within
+    max_nodes so it stays under the document size limit. Shallower
+    levels keep the requested breadth as long as every deeper level
+    can still fetch one reply. Levels that do not fit are left out.
+    """
+    breadths = []
+    used = 0
+    parents = 1
+
+    for level in range(levels):
+        # Nodes below each fetched reply if deeper levels fetch one,
+        # counting the extra reply fetched to detect a next page
+        per_reply = 2 ** (levels - level) - 1
+        level_breadth = min(
+            breadth, (max_nodes - used) // (parents * per_reply) - 1
+        )
+        if level_breadth < 1:
+            break
+
+        breadths.append(level_breadth)
+        parents *= level_breadth + 1
+        used += parents
+
+    return breadths
+
+
+def replies_lookup(post_id: str, breadths: List[int]) -> Dict[str, Any]:
+    """
+    Gets the $lookup stage attaching the newest breadth + 1 replies
+    of each comment as its children, one nested level per breadth
+    """
+    pipeline = [
+        {
+            "$match": {
+                "post_id": post_id,
+                "$expr": {"$eq": ["$reply_to_id", "$$parent_id"]},
+            }
+        },
+        {"$sort": TREE_SORT},
+        {"$limit": breadths[0] + 1},
+    ]
+    if len(breadths) > 1:
+        pipeline.append(replies_lookup(post_id, breadths[1:]))
+
+    return {
+        "$lookup": {
+            "from": "comments",
+            "let": {"parent_id": {"$toString": "$_id"}},
+            "pipeline": pipeline,
+            "as": "children",
+        }
+    }
+
+
+def comment_tree_pipeline(
+    post_id: str,
+    reply_to_id: Optional[str],
+    cursor: Optional[str],
+    breadths: List[int],
+) -> List[Dict[str, Any]]:
+    """Gets the aggregation pipeline of a comment tree"""
+    match = {"post_id": post_id, "reply_to_id": reply_to_id}
+    if cursor is not None:
+        match = {"$and": [match, keyset_filter(cursor, TREE_SORT_FIELD)]}
+
+    pipeline = [
+        {"$match": match},
+        {"$sort": TREE_SORT},
+        {"$limit": breadths[0] + 1},
+    ]
+    if len(breadths) > 1:
+        pipeline.append(replies_lookup(post_id, breadths[1:]))
+
+    return pipeline
+
+
+def assemble_level(
+    documents: List[Dict[str, Any]], breadths: List[int]
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Trims each tree level to its breadth, decoding the comments and
+    their children in place
+
+    Returns:
+        The comments of the level and the cursor of its next page
+    """
+    if not breadths:
+        return [], None
+
+    next_cursor = None
+    if len(documents) > breadths[0]:
+        documents = documents[: breadths[0]]
+        next_cursor = encode_cursor(documents[-1], TREE_SORT_FIELD)
+
+    for document in documents:
+        children, document["next_cursor"] = assemble_level(
+            document.pop("children", []), breadths[1:]
+        )
+        document["children"] = children
+        decode_document(document)
+
+    return documents, next_cursor
+
+
+async def find_comment_tree(
+    collection: AsyncIOMotorCollection,
+    post_id: str,
+    reply_to_id: Optional[str],
+    cursor: Optional[str],
+    breadth: int,
+    depth: int,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Gets a page of comments with up to depth levels of their replies,
+    at most breadth per level, with a single aggregation. Each level
+    is a (post_id, reply_to_id) index range. Deeper levels get fewer
+    replies, or are left out, when the replies of a comment would
+    exceed COMMENT_TREE_MAX_NODES.
+
+    Returns:
+        The top level comments and the cursor of the next page. Every
+        comment carries its children and the cursor continuing them.
+    """
+    breadths = [breadth] + reply_breadths(
+        breadth, depth - 1, settings.COMMENT_TREE_MAX_NODES
+    )
+    documents = await collection.aggregate(
+        comment_tree_pipeline(post_id, reply_to_id, cursor, breadths)
+    ).to_list(length=None)
+
+    return assemble_level(documents, breadths)
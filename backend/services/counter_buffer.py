@@ -0,0 +1,47 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from core.cache import TTLCache
+from core.config import settings
+
+# Key of a buffered counter: the collection and id of the target
+CounterKey = Tuple[str, str]
+
+
+class CounterBuffer:
+    """
+    Accumulates the like and dislike deltas of reactions per target
+    so a burst of reactions on one post is written as a single
+    increment. Meant to be used from the event loop thread only.
+    """
+
+    def __init__(self) -> None:
+        self._deltas: Dict[CounterKey, List[int]] = defaultdict(lambda: [0, 0])
+
+    def add(
+        self, collection: str, target_id: str, likes: int, dislikes: int
+    ) -> None:
+        """Adds the deltas of a reaction to its target"""
+        deltas = self._deltas[(collection, target_id)]
+        deltas[0] += likes
+        deltas[1] += dislikes
+
+    def drain(self) -> Dict[CounterKey, List[int]]:
+        """Takes every pending delta, leaving the buffer empty"""
+        deltas = self._deltas
+        self._deltas = defaultdict(lambda: [0, 0])
+
+        return {key: value for key, value in deltas.items() if any(value)}
+
+    def __len__(self) -> int:
+        return len(self._deltas)
+
+
+counter_buffer = CounterBuffer()
+
+# Collection holding each recently reacted to target, so buffered
+# reactions can be checked and routed without a write
+reaction_targets = TTLCache(
+    maxsize=settings.REACTION_TARGET_CACHE_SIZE,
+    ttl=settings.REACTION_TARGET_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,33 @@
+from typing import Any, Dict, Iterable, List, Type, TypeVar
+
+from bson.objectid import ObjectId
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def decode_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts a raw BSON document in place into the field
+    layout of the schema models: the ObjectId _id becomes
+    the string id. Datetimes are kept as they are.
+    """
+    if "_id" in document:
+        id = document.pop("_id")
+        document["id"] = str(id) if isinstance(id, ObjectId) else id
+
+    return document
+
+
+def decode(model: Type[M], document: Dict[str, Any]) -> M:
+    """Decodes a raw BSON document into a schema model"""
+    return model.model_validate(decode_document(document))
+
+
+def decode_many(
+    model: Type[M], documents: Iterable[Dict[str, Any]]
+) -> List[M]:
+    """Decodes raw BSON documents into schema models"""
+    validate = model.model_validate
+
+    return [validate(decode_document(document)) for document in documents]
@@ -0,0 +1,204 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Dict, Iterable, Optional, Tuple
+
+from core.cache import TTLCache
+from core.config import settings
+from schemas.posts import PostSortTypes
+
+
+class FeedCacheBackend(ABC):
+    """Defines the storage used by the feed cache"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_generation(self, name: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def bump_generation(self, name: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryFeedCacheBackend(FeedCacheBackend):
+    """Keeps cached feed pages in the worker process"""
+
+    def __init__(self, maxsize: int) -> None:
+        self.pages = TTLCache(maxsize=maxsize, ttl=0)
+        self.generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.pages.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.pages.set(key, value, ttl)
+
+    async def get_generation(self, name: str) -> int:
+        return self.generations.get(name, 0)
+
+    async def bump_generation(self, name: str) -> None:
+        self.generations[name] = self.generations.get(name, 0) + 1
+
+
+class RedisFeedCacheBackend(FeedCacheBackend):
+    """Shares cached feed pages between worker processes through redis"""
+
+    def __init__(self, url: str) -> None:
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.redis.set(key, value, px=int(ttl * 1000))
+
+    async def get_generation(self, name: str) -> int:
+        return int(await self.redis.get(f"generation:{name}") or 0)
+
+    async def bump_generation(self, name: str) -> None:
+        await self.redis.incr(f"generation:{name}")
+
+
+@dataclass
+class FeedCacheKey:
+    prefix: str
+    cursor: Optional[str]
+    depth: int
+    sort_by: PostSortTypes
+
+    @property
+    def page(self) -> str:
+        return f"{self.prefix}:{self.cursor or ''}"
+
+
+class FeedCache:
+    """
+    Caches the serialized first pages of the anonymous post feeds.
+    HOT pages live for a short time to live. NEW and TOP pages are
+    dropped as soon as posts or reactions change, by bumping the
+    generation that is part of their keys.
+    """
+
+    def __init__(
+        self,
+        backend: FeedCacheBackend,
+        max_pages: int,
+        ttls: Dict[PostSortTypes, float],
+    ) -> None:
+        self.backend = backend
+        self.max_pages = max_pages
+        self.ttls = ttls
+        self.logger = getLogger(__name__ + ".FeedCache")
+
+    async def key(
+        self,
+        sort_by: PostSortTypes,
+        variant: Tuple,
+        cursor: Optional[str],
+        page_size: int,
+    ) -> Optional[FeedCacheKey]:
+        """
+        Gets the cache key of a feed page
+
+        Returns:
+            None if the page is too deep to be cached
+        """
+        if self.max_pages <= 0:
+            return None
+
+        try:
+            generation = await self.backend.get_generation(sort_by.value)
+            prefix = ":".join(
+                ["feed", sort_by.value, str(generation), str(page_size)]
+                + [str(value) for value in variant]
+            )
+
+            depth = 0
+            if cursor is not None:
+                depth = await self.backend.get(f"depth:{prefix}:{cursor}")
+                if depth is None:
+                    return None
+                depth = int(depth)
+        except Exception as ex:
+            self.logger.error(ex)
+            return None
+
+        return FeedCacheKey(prefix, cursor, depth, sort_by)
+
+    async def get(self, key: Optional[FeedCacheKey]) -> Optional[bytes]:
+        """Gets a cached feed page"""
+        if key is None:
+            return None
+
+        try:
+            return await self.backend.get(key.page)
+        except Exception as ex:
+            self.logger.error(ex)
+            return None
+
+    async def set(
+        self,
+        key: Optional[FeedCacheKey],
+        page: bytes,
+        next_cursor: Optional[str],
+    ) -> None:
+        """Caches a feed page and allows caching the page after it"""
+        if key is None:
+            return
+
+        ttl = self.ttls[key.sort_by]
+        try:
+            await self.backend.set(key.page, page, ttl)
+            if next_cursor is not None and key.depth + 1 < self.max_pages:
+                await self.backend.set(
+                    f"depth:{key.prefix}:{next_cursor}",
+                    str(key.depth + 1).encode(),
+                    ttl,
+                )
+        except Exception as ex:
+            self.logger.error(ex)
+
+    async def invalidate(
+        self,
+        sort_types: Iterable[PostSortTypes] = (
+            PostSortTypes.NEW,
+            PostSortTypes.TOP,
+        ),
+    ) -> None:
+        """Drops the cached pages of the sort types"""
+        for sort_by in sort_types:
+            try:
+                await self.backend.bump_generation(sort_by.value)
+            except Exception as ex:
+                self.logger.error(ex)
+
+
+def create_feed_cache() -> FeedCache:
+    """Creates the feed cache configured in the settings"""
+    if settings.FEED_CACHE_URL:
+        backend = RedisFeedCacheBackend(settings.FEED_CACHE_URL)
+    else:
+        backend = MemoryFeedCacheBackend(settings.FEED_CACHE_SIZE)
+
+    return FeedCache(
+        backend=backend,
+        max_pages=settings.FEED_CACHE_PAGES,
+        ttls={
+            PostSortTypes.HOT: settings.FEED_CACHE_HOT_TTL_SECONDS,
+            PostSortTypes.NEW: settings.FEED_CACHE_TTL_SECONDS,
+            PostSortTypes.TOP: settings.FEED_CACHE_TTL_SECONDS,
+        },
+    )
+
+
+feed_cache = create_feed_cache()
@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from core.config import settings
+from services.media import MEDIA_DIR, media_url, partial_media_path
+
+# Bounding boxes of the resized copies generated for every post image
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    "thumbnail": (320, 320),
+    "feed": (1080, 1350),
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def render_variants(directory: str, filename: str) -> Dict[str, str]:
+    """
+    Writes the resized WebP copies of an image unless they were
+    already rendered for an identical upload. Each copy is written to
+    a partial file and renamed into place, so a copy found under its
+    final name is always complete.
+    Runs in a worker process of the image pool.
+
+    Returns:
+        The file names of the variants by variant name
+    """
+    from PIL import Image, ImageOps
+
+    name = filename.rsplit(".", 1)[0]
+    variants = {
+        variant: f"{name}_{variant}.webp" for variant in VARIANTS.keys()
+    }
+
+    if all(
+        os.path.exists(os.path.join(directory, variant_filename))
+        for variant_filename in variants.values()
+    ):
+        return variants
+
+    with Image.open(os.path.join(directory, filename)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+
+        for variant, size in VARIANTS.items():
+            variant_filename = variants[variant]
+            copy = image.copy()
+            copy.thumbnail(size)
+            partial_path = partial_media_path(directory)
+            try:
+                copy.save(partial_path, "WEBP", quality=80, method=4)
+                os.replace(
+                    partial_path, os.path.join(directory, variant_filename)
+                )
+            except BaseException:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                raise
+
+    return variants
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Gets the image pool, starting it on first use"""
+    global _executor
+
+    if _executor is None:
+        # Spawned rather than forked since the server process runs
+        # driver threads whose locks must not be copied into workers
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stops the image pool"""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def generate_image_variants(filename: str) -> Dict[str, str]:
+    """
+    Generates the resized copies of a media image in the image pool
+
+    Returns:
+        The urls of the variants by variant name
+    """
+    loop = asyncio.get_running_loop()
+    variants = await loop.run_in_executor(
+        get_executor(), render_variants, MEDIA_DIR, filename
+    )
+
+    return {
+        variant: media_url(variant_filename)
+        for variant, variant_filename in variants.items()
+    }
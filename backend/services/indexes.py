@@ -0,0 +1,200 @@
+from logging import getLogger
+from typing import Any, Dict, List, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+# Declared indexes of every collection. Each entry backs a query
+# issued by the routers or the storage, keyed as filter fields
+# followed by the sort fields.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("date_created", DESCENDING)]),
+    ],
+    "categories": [
+        IndexModel([("name", ASCENDING)], unique=True),
+    ],
+    "posts": [
+        IndexModel([("date_created", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel(
+            [
+                ("category_id", ASCENDING),
+                ("date_created", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexModel(
+            [
+                ("category_id", ASCENDING),
+                ("category_topic", ASCENDING),
+                ("date_created", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexModel(
+            [
+                ("user_id", ASCENDING),
+                ("date_created", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexModel([("hot_score", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel(
+            [("title", TEXT), ("content", TEXT)],
+            weights={"title": 3, "content": 1},
+        ),
+        IndexModel(
+            [
+                ("category_id", ASCENDING),
+                ("hot_score", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexModel([("net_votes", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel(
+            [
+                ("category_id", ASCENDING),
+                ("net_votes", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+    ],
+    "comments": [
+        IndexModel(
+            [
+                ("post_id", ASCENDING),
+                ("reply_to_id", ASCENDING),
+                ("date_created", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+        IndexModel([("content", TEXT)]),
+    ],
+    "reactions": [
+        IndexModel(
+            [("target_id", ASCENDING), ("user_id", ASCENDING)], unique=True
+        ),
+        IndexModel([("user_id", ASCENDING), ("target_id", ASCENDING)]),
+        IndexModel([("target_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel(
+            [
+                ("target_id", ASCENDING),
+                ("is_like", ASCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+    ],
+    "mail_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        IndexModel(
+            [("date_sent", ASCENDING)], expireAfterSeconds=7 * 24 * 3600
+        ),
+    ],
+}
+
+
+def text_key(
+    key: List[Tuple[str, Any]], text_fields: List[str]
+) -> Tuple[Tuple[str, Any], ...]:
+    """
+    Gets the key of a text index in a form comparable between the
+    declaration and the server, which reports the text fields as
+    _fts and _ftsx
+    """
+    fields = [
+        (field, value)
+        for field, value in key
+        if value != TEXT and field not in ["_fts", "_ftsx"]
+    ]
+
+    return tuple(fields + [(field, TEXT) for field in sorted(text_fields)])
+
+
+def index_key(index: IndexModel) -> Tuple[Tuple[str, Any], ...]:
+    """Gets the key of a declared index"""
+    key = list(index.document["key"].items())
+    text_fields = [field for field, value in key if value == TEXT]
+
+    if text_fields:
+        return text_key(key, text_fields)
+
+    return tuple(key)
+
+
+async def apply_indexes(db: AsyncIOMotorDatabase) -> List[str]:
+    """
+    Creates the declared indexes. Indexes that already exist
+    are left untouched, so this is safe to run on every startup.
+
+    Returns:
+        The names of the indexes that could not be created
+    """
+    logger = getLogger(__name__ + ".apply_indexes")
+    failed = []
+
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                await db[collection].create_indexes([index])
+            except OperationFailure as ex:
+                logger.error(f"{collection}.{name}: {ex}")
+                failed.append(f"{collection}.{name}")
+
+    return failed
+
+
+async def audit_indexes(
+    db: AsyncIOMotorDatabase,
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Compares the existing indexes with the declared ones
+
+    Returns:
+        Per collection, the names of the declared indexes that are
+        missing, the existing indexes that are not declared and the
+        existing indexes made redundant by a longer index sharing
+        their key as a prefix
+    """
+    report = {}
+
+    for collection, indexes in INDEXES.items():
+        info = await db[collection].index_information()
+        existing = {
+            name: (
+                text_key(spec["key"], list(spec["weights"]))
+                if "weights" in spec
+                else tuple(spec["key"])
+            )
+            for name, spec in info.items()
+            if name != "_id_"
+        }
+        declared = {index_key(index) for index in indexes}
+
+        missing = [
+            index.document["name"]
+            for index in indexes
+            if index_key(index) not in existing.values()
+        ]
+        undeclared = [
+            name for name, key in existing.items() if key not in declared
+        ]
+        redundant = [
+            name
+            for name, key in existing.items()
+            if not info[name].get("unique")
+            and any(
+                len(other) > len(key) and other[: len(key)] == key
+                for other in existing.values()
+            )
+        ]
+
+        report[collection] = {
+            "missing": missing,
+            "undeclared": undeclared,
+            "redundant": redundant,
+        }
+
+    return report
@@ -0,0 +1,296 @@
+import asyncio
+import random
+import smtplib
+import ssl
+import time
+from datetime import UTC, datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from logging import getLogger
+from typing import Dict, List, Optional
+
+from core.config import settings
+from core.storage import storage
+from fastapi.concurrency import run_in_threadpool
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+
+# SMTP errors that reject a single message while leaving the
+# connection usable. Any other error, smtplib's included as they
+# derive from OSError, is treated as a broken connection.
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+def build_email(subject: str, body: str, receiver_email: str) -> str:
+    """
+    Builds the MIME text of an email
+
+    Args:
+        subject: the email subject
+        body: the html email body
+        receiver_email: the receiver email
+    """
+    html_body = body
+    # Set up the MIME
+    email_msg = MIMEMultipart()
+    email_msg["From"] = settings.EMAIL_ACCOUNT
+    email_msg["To"] = receiver_email
+    email_msg["Subject"] = subject
+
+    # Attach the message to the email
+    email_msg.attach(MIMEText(html_body, "html"))
+
+    return email_msg.as_string()
+
+
+class SMTPSender:
+    """
+    Sends emails over a single SMTP connection that is kept
+    open and logged in between batches. Not thread safe, the
+    mail worker is its only user.
+    """
+
+    def __init__(self):
+        """Initializes the sender without connecting"""
+        self.connection: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+
+    def connect(self) -> smtplib.SMTP:
+        """Opens and logs in a connection to the SMTP server"""
+        if settings.SMTP_USE_SSL:
+            connection = smtplib.SMTP_SSL(
+                settings.SMTP_HOST,
+                settings.SMTP_PORT,
+                context=ssl.create_default_context(),
+                timeout=settings.SMTP_TIMEOUT_SECONDS,
+            )
+        else:
+            connection = smtplib.SMTP(
+                settings.SMTP_HOST,
+                settings.SMTP_PORT,
+                timeout=settings.SMTP_TIMEOUT_SECONDS,
+            )
+
+        if settings.EMAIL_PASSWORD:
+            connection.login(settings.EMAIL_ACCOUNT, settings.EMAIL_PASSWORD)
+
+        return connection
+
+    def close(self) -> None:
+        """Closes the connection if one is open"""
+        if self.connection is None:
+            return
+
+        try:
+            self.connection.quit()
+        except smtplib.SMTPException:
+            self.connection.close()
+        except OSError:
+            pass
+        self.connection = None
+
+    def close_if_idle(self, idle_seconds: float) -> None:
+        """Closes the connection if it has not been used for a while"""
+        if time.monotonic() - self.last_used >= idle_seconds:
+            self.close()
+
+    def send(self, message: Dict) -> None:
+        """
+        Sends an outbox message, reconnecting once if the
+        server dropped the connection since the last send
+        """
+        text = build_email(
+            message["subject"], message["body"], message["receiver_email"]
+        )
+
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connect()
+            try:
+                self.connection.sendmail(
+                    settings.EMAIL_ACCOUNT, message["receiver_email"], text
+                )
+                break
+            except smtplib.SMTPServerDisconnected:
+                self.connection = None
+                if attempt:
+                    raise
+
+        self.last_used = time.monotonic()
+
+    def send_batch(self, messages: List[Dict]) -> List[Optional[str]]:
+        """
+        Sends outbox messages in order. A message the server rejects
+        does not affect the others, but once the connection fails
+        the rest of the batch is left for a later attempt.
+
+        Returns:
+            For every message, None if it was sent or the error
+            that stopped it from being sent
+        """
+        errors = []
+
+        for message in messages:
+            try:
+                self.send(message)
+                errors.append(None)
+            except OSError as ex:
+                errors.append(f"{type(ex).__name__}: {ex}")
+                if isinstance(ex, MESSAGE_ERRORS):
+                    continue
+
+                self.close()
+                errors.extend(errors[-1:] * (len(messages) - len(errors)))
+                break
+            except Exception as ex:
+                # A message smtplib cannot encode fails on its own. The
+                # connection may be mid transaction, so it is reopened
+                # for the next message.
+                errors.append(f"{type(ex).__name__}: {ex}")
+                self.close()
+
+        return errors
+
+
+class MailOutbox:
+    """
+    Durable queue of outbound emails kept in a db collection.
+    Requests only insert into it, a background worker claims
+    batches of due messages and sends them over one reused SMTP
+    connection, retrying failed sends with exponential backoff.
+
+    A claimed message is leased by pushing its next attempt into
+    the future, so a message held by a worker that died is picked
+    up again once the lease runs out.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        """Initializes the outbox"""
+        self.collection = collection
+        self.sender = SMTPSender()
+        self.wakeup = asyncio.Event()
+
+    async def enqueue(
+        self, subject: str, body: str, receiver_email: str
+    ) -> str:
+        """Adds an email to the outbox and wakes the worker"""
+        date = datetime.now(UTC)
+        message = {
+            "subject": subject,
+            "body": body,
+            "receiver_email": receiver_email,
+            "status": "pending",
+            "attempts": 0,
+            "last_error": None,
+            "next_attempt_at": date,
+            "date_created": date,
+            "date_modified": date,
+        }
+
+        id = str((await self.collection.insert_one(message)).inserted_id)
+        self.wakeup.set()
+
+        return id
+
+    async def claim(self, limit: int) -> List[Dict]:
+        """Claims up to limit due messages, oldest first"""
+        messages = []
+
+        while len(messages) < limit:
+            date = datetime.now(UTC)
+            message = await self.collection.find_one_and_update(
+                {"status": "pending", "next_attempt_at": {"$lte": date}},
+                {
+                    "$set": {
+                        "next_attempt_at": date
+                        + timedelta(seconds=settings.MAIL_LEASE_SECONDS),
+                        "date_modified": date,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("next_attempt_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if message is None:
+                break
+            messages.append(message)
+
+        return messages
+
+    def retry_delay(self, attempts: int) -> float:
+        """Gets the jittered backoff before the next attempt"""
+        delay = min(
+            settings.MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+            settings.MAIL_RETRY_MAX_SECONDS,
+        )
+        return delay * random.uniform(0.5, 1)
+
+    async def deliver(self, messages: List[Dict]) -> int:
+        """
+        Sends claimed messages and records the outcome of each
+
+        Returns:
+            The number of messages sent
+        """
+        logger = getLogger(__name__ + ".deliver")
+
+        errors = await run_in_threadpool(self.sender.send_batch, messages)
+
+        date = datetime.now(UTC)
+        updates = []
+        for message, error in zip(messages, errors):
+            if error is None:
+                update = {"status": "sent", "date_sent": date}
+            elif message["attempts"] >= settings.MAIL_MAX_ATTEMPTS:
+                logger.error(f"giving up on {message['_id']}: {error}")
+                update = {"status": "failed", "last_error": error}
+            else:
+                logger.warning(f"retrying {message['_id']}: {error}")
+                update = {
+                    "last_error": error,
+                    "next_attempt_at": date
+                    + timedelta(seconds=self.retry_delay(message["attempts"])),
+                }
+            update["date_modified"] = date
+            updates.append(
+                UpdateOne({"_id": message["_id"]}, {"$set": update})
+            )
+
+        await self.collection.bulk_write(updates, ordered=False)
+
+        return errors.count(None)
+
+    async def run(self):
+        """Sends queued emails until cancelled"""
+        logger = getLogger(__name__ + ".run")
+
+        try:
+            while True:
+                self.wakeup.clear()
+                try:
+                    messages = await self.claim(settings.MAIL_BATCH_SIZE)
+                    if messages:
+                        await self.deliver(messages)
+                        continue
+
+                    await run_in_threadpool(
+                        self.sender.close_if_idle, settings.SMTP_IDLE_SECONDS
+                    )
+                except Exception as ex:
+                    logger.error(ex)
+
+                try:
+                    await asyncio.wait_for(
+                        self.wakeup.wait(), settings.MAIL_POLL_SECONDS
+                    )
+                except TimeoutError:
+                    pass
+        finally:
+            self.sender.close()
+
+
+mail_outbox = MailOutbox(storage.db["mail_outbox"])
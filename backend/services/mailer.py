@@ -1,49 +1,25 @@
-import smtplib
-import ssl
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-
 # from logging import getLogger
 from os import getenv
 
 from dotenv import load_dotenv
+from services.mail_outbox import mail_outbox
 
 load_dotenv()
 
 
-def send_email(subject: str, body: str, receiver_email: str) -> None:
+async def send_email(subject: str, body: str, receiver_email: str) -> None:
     """
-    Sends an email to a receiver
+    Queues an email for the mail worker to send
 
     Args:
         subject: the email subject
         body: the email body
         receiver_email: the receiver email
     """
-    sender_email = getenv("EMAIL_ACCOUNT")
-    sender_password = getenv("EMAIL_PASSWORD")
-    server = getenv("SMTP_HOST")
-    port = int(getenv("SMTP_PORT"))
-
-    html_body = body
-    # Set up the MIME
-    email_msg = MIMEMultipart()
-    email_msg["From"] = sender_email
-    email_msg["To"] = receiver_email
-    email_msg["Subject"] = subject
-
-    # Attach the message to the email
-    email_msg.attach(MIMEText(html_body, "html"))
-
-    context = ssl.create_default_context()
-
-    with smtplib.SMTP_SSL(server, port, context=context) as server:
-        server.login(sender_email, sender_password)
-        text = email_msg.as_string()
-        server.sendmail(sender_email, receiver_email, text)
+    await mail_outbox.enqueue(subject, body, receiver_email)
 
 
-def send_email_verification(receiver_email: str, token: str) -> None:
+async def send_email_verification(receiver_email: str, token: str) -> None:
 
     url = f"{getenv('VERIFY_EMAIL_URL')}?token={token}"
     sender_email = getenv("EMAIL_ACCOUNT")
@@ -59,10 +35,10 @@ def send_email_verification(receiver_email: str, token: str) -> None:
   </body>
 </html>
 """
-    send_email(subject, html_body, receiver_email)
+    await send_email(subject, html_body, receiver_email)
 
 
-def send_reset_email(receiver_email: str, token: str) -> None:
+async def send_reset_email(receiver_email: str, token: str) -> None:
 
     url = f"{getenv('RESET_PASSWORD_URL')}?token={token}"
     sender_email = getenv("EMAIL_ACCOUNT")
@@ -78,4 +54,4 @@ def send_reset_email(receiver_email: str, token: str) -> None:
   </body>
 </html>
 """
-    send_email(subject, html_body, receiver_email)
+    await send_email(subject, html_body, receiver_email)
@@ -0,0 +1,228 @@
+import hashlib
+import os
+import re
+import time
+import uuid
+from typing import AsyncIterator, BinaryIO, List, Optional, Set, Tuple
+
+import anyio
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+
+from core.config import settings
+
+MEDIA_DIR = "./media"
+MEDIA_URL = "/api/v1/media"
+CHUNK_SIZE = 64 * 1024
+MEDIA_FILENAME = re.compile(r"[\w-]+\.\w+")
+
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Gets the file extension of an image from its first bytes"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+
+    return None
+
+
+def media_url(filename: str) -> str:
+    """Gets the url a media file is served from"""
+    return f"{MEDIA_URL}/{filename}"
+
+
+def partial_media_path(directory: str = MEDIA_DIR) -> str:
+    """Gets a unique path to write a media file to before renaming it"""
+    return os.path.join(directory, f".{uuid.uuid4().hex}.part")
+
+
+def prune_media(referenced: Set[str], older_than: float) -> List[str]:
+    """
+    Removes the media files no post refers to, along with their
+    resized copies and abandoned partial files. Files newer than
+    older_than seconds are kept since their post may still be
+    being inserted.
+
+    Args:
+        referenced: the names of the media files posts refer to
+
+    Returns:
+        The names of the removed files
+    """
+    cutoff = time.time() - older_than
+    originals = {filename.rsplit(".", 1)[0] for filename in referenced}
+    removed = []
+
+    for entry in os.scandir(MEDIA_DIR):
+        if not entry.is_file() or entry.stat().st_mtime > cutoff:
+            continue
+
+        original = entry.name.rsplit(".", 1)[0].split("_", 1)[0]
+        if not entry.name.endswith(".part") and original in originals:
+            continue
+
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        removed.append(entry.name)
+
+    return removed
+
+
+def write_chunk(file: BinaryIO, digest: "hashlib._Hash", chunk: bytes):
+    """Writes a chunk of an upload and adds it to its digest"""
+    digest.update(chunk)
+    file.write(chunk)
+
+
+async def save_upload(upload: UploadFile) -> str:
+    """
+    Copies an uploaded image to the media directory in chunks,
+    doing the file I/O off the event loop. The image type is taken
+    from the file content rather than the client supplied name.
+
+    The framework spools the whole multipart body to a temporary file
+    before the handler runs, so this is a second copy. The body is
+    bounded earlier by BodySizeLimitMiddleware, and the image itself by
+    MEDIA_MAX_UPLOAD_BYTES here.
+
+    Files are named after the SHA-256 of their content, so a name
+    always refers to the same bytes and identical uploads are only
+    stored once. Since a file may be shared by several posts, files are
+    only removed by prune_media.
+
+    Args:
+        upload: the uploaded image
+
+    Returns:
+        The name of the saved file
+    """
+    chunk = await upload.read(CHUNK_SIZE)
+    extension = sniff_image_type(chunk)
+
+    if extension is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Unsupported image type. Use JPEG, PNG, GIF or WebP",
+        )
+
+    partial_path = partial_media_path()
+    digest = hashlib.sha256()
+    size = 0
+
+    file = await run_in_threadpool(open, partial_path, "wb")
+    try:
+        while chunk:
+            size += len(chunk)
+            if size > settings.MEDIA_MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail="Image too large. Maximum size is "
+                    + f"{settings.MEDIA_MAX_UPLOAD_BYTES} bytes",
+                )
+            await run_in_threadpool(write_chunk, file, digest, chunk)
+            chunk = await upload.read(CHUNK_SIZE)
+    except BaseException:
+        await run_in_threadpool(file.close)
+        await run_in_threadpool(os.remove, partial_path)
+        raise
+
+    await run_in_threadpool(file.close)
+
+    filename = f"{digest.hexdigest()}.{extension}"
+    path = os.path.join(MEDIA_DIR, filename)
+
+    if await run_in_threadpool(os.path.exists, path):
+        await run_in_threadpool(os.remove, partial_path)
+        return filename
+
+    await run_in_threadpool(os.replace, partial_path, path)
+
+    return filename
+
+
+media_not_found_exception = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Media not found",
+)
+
+
+def media_path(filename: str) -> str:
+    """
+    Gets the path of a media file
+
+    Raises:
+        HTTPException if the name is not a media file name
+    """
+    if MEDIA_FILENAME.fullmatch(filename) is None:
+        raise media_not_found_exception
+
+    return os.path.join(MEDIA_DIR, filename)
+
+
+def media_etag(filename: str) -> str:
+    """
+    Gets the strong entity tag of a media file. Media files are never
+    rewritten under the same name, so the name identifies the content.
+    """
+    return f'"{filename.rsplit(".", 1)[0]}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single byte range of a Range header
+
+    Returns:
+        The first and last byte positions of the range or None when
+        the header should be ignored and the whole file served
+
+    Raises:
+        HTTPException if the range cannot be satisfied
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+
+    if start < 0 or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    return start, end
+
+
+async def read_range(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    """Reads the bytes from start to end of a file in chunks"""
+    async with await anyio.open_file(path, "rb") as file:
+        await file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -1,6 +1,5 @@
-import json
 from datetime import UTC, datetime
-from typing import Any, Dict
+from typing import Dict, List, Optional, Set
 
 import schemas.categories as s_categories
 import schemas.comments as s_comments
@@ -8,47 +7,60 @@ import schemas.posts as s_posts
 import schemas.reactions as s_reactions
 import schemas.user as s_user
 from bson.objectid import ObjectId
-from core.authentication.hashing import get_hash
+from core.authentication.hashing import get_hash_async
+from core.authentication.user_cache import user_cache
 from core.config import settings
+from core.metrics import CommandMetricsListener, instrument
+from core.query_monitor import create_query_listener
 from dotenv import load_dotenv
 from fastapi import HTTPException, status
-from pymongo import ASCENDING, DESCENDING, MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from services.counter_buffer import counter_buffer, reaction_targets
+from services.decoding import decode, decode_many
+from services.feed_cache import feed_cache
+from services.indexes import apply_indexes
+from services.ranking import (
+    counters_update_pipeline,
+    score_fields,
+    score_fields_expression,
+)
+from services.timeline import TIMELINE_FIELDS, timelines
 
 load_dotenv()
 
 
-def change_id_key(obj: Dict[str, Any]) -> Dict[str, Any]:
-    """Changes the _id key to id"""
-
-    if "_id" in obj:
-        obj["id"] = obj["_id"]
-        del obj["_id"]
-
-    return obj
-
-
-class MongoStorage:
+@instrument
+class AsyncMongoStorage:
     """
-    Defines functions for interacting
+    Defines asynchronous functions for interacting
     with the BuzzBoard db storage
     """
 
     def __init__(self):
         """Initializes the storage class"""
-        self.client = MongoClient(settings.MONGO_DB_URI)
-        self.db = self.client[settings.DB_NAME]
-        self.db["users"].create_index([("email", ASCENDING)], unique=True)
-        self.db["users"].create_index(
-            [("date_created", DESCENDING)], unique=False
+        listeners = [CommandMetricsListener()]
+        query_listener = create_query_listener()
+        if query_listener is not None:
+            listeners.append(query_listener)
+
+        self.client = AsyncIOMotorClient(
+            settings.MONGO_DB_URI, event_listeners=listeners
         )
+        self.db = self.client[settings.DB_NAME]
+
+    async def create_indexes(self):
+        """Creates the declared collection indexes"""
+        await apply_indexes(self.db)
 
     # Users
-    def create_user_record(self, form_data: s_user.UserIn) -> str:
+    async def create_user_record(self, form_data: s_user.UserIn) -> str:
         """Creates a user record"""
 
         users_table = self.db["users"]
 
-        if users_table.find_one({"email": form_data.email}):
+        if await users_table.find_one({"email": form_data.email}):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already taken",
@@ -63,35 +75,34 @@ class MongoStorage:
 
         date = datetime.now(UTC)
         user = form_data.model_dump()
-        user["password"] = get_hash(form_data.password)
+        user["password"] = await get_hash_async(form_data.password)
         user["status"] = s_user.UserStatus.UNVERIFIED
         user["role"] = s_user.Role.USER
         user["subscribed"] = []
         user["date_created"] = date
         user["date_modified"] = date
 
-        id = str(users_table.insert_one(user).inserted_id)
+        id = str((await users_table.insert_one(user)).inserted_id)
 
         return id
 
-    def get_user_record(self, filter: Dict) -> s_user.User:
+    async def get_user_record(self, filter: Dict) -> s_user.User:
         """Gets a user record from the db using the supplied keys"""
         users = self.db["users"]
 
         if "_id" in filter and type(filter["_id"]) is str:
             filter["_id"] = ObjectId(filter["_id"])
 
-        user = users.find_one(filter)
+        user = await users.find_one(filter)
 
         if user:
-            user = change_id_key(json.loads(json.dumps(user, default=str)))
-            user = s_user.User(**user)
+            user = decode(s_user.User, user)
 
         return user
 
-    def verify_user_record(self, filter: Dict) -> s_user.User:
+    async def verify_user_record(self, filter: Dict) -> s_user.User:
         """Checks if a user record exists in the db using the supplied keys"""
-        user = self.get_user_record(filter)
+        user = await self.get_user_record(filter)
 
         if user is None:
             raise HTTPException(
@@ -100,9 +111,9 @@ class MongoStorage:
 
         return user
 
-    def update_user_record(self, filter: Dict, update: Dict):
+    async def update_user_record(self, filter: Dict, update: Dict):
         """Updates a user record"""
-        self.verify_user_record(filter)
+        user = await self.verify_user_record(filter)
 
         for key in ["_id", "email"]:
             if key in update:
@@ -112,24 +123,28 @@ class MongoStorage:
             filter["_id"] = ObjectId(filter["_id"])
         update["date_modified"] = datetime.now(UTC)
 
-        self.db["users"].update_one(filter, {"$set": update})
+        await self.db["users"].update_one(filter, {"$set": update})
+        user_cache.pop(user.email)
 
-    def delete_user_record(self, filter: Dict):
+    async def delete_user_record(self, filter: Dict):
         """Deletes a user record by the filter"""
-        self.verify_user_record(filter)
+        user = await self.verify_user_record(filter)
 
         if "_id" in filter and type(filter["_id"]) is str:
             filter["_id"] = ObjectId(filter["_id"])
 
-        self.db["users"].delete_one(filter)
+        await self.db["users"].delete_one(filter)
+        user_cache.pop(user.email)
 
     # Categories
-    def create_category_record(self, data: s_categories.CategoryIn) -> str:
+    async def create_category_record(
+        self, data: s_categories.CategoryIn
+    ) -> str:
         """Creates a category record"""
 
         categories = self.db["categories"]
 
-        if categories.find_one({"name": data.name}):
+        if await categories.find_one({"name": data.name}):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Category already exists",
@@ -140,11 +155,11 @@ class MongoStorage:
         category["date_created"] = date
         category["date_modified"] = date
 
-        id = str(categories.insert_one(category).inserted_id)
+        id = str((await categories.insert_one(category)).inserted_id)
 
         return id
 
-    def get_category_record(self, filter: Dict) -> s_categories.Category:
+    async def get_category_record(self, filter: Dict) -> s_categories.Category:
         """Gets a category record using the filter"""
 
         categories = self.db["categories"]
@@ -152,22 +167,21 @@ class MongoStorage:
         if "_id" in filter and type(filter["_id"]) is str:
             filter["_id"] = ObjectId(filter["_id"])
 
-        category = categories.find_one(filter)
+        category = await categories.find_one(filter)
 
         if category:
-            category = change_id_key(
-                json.loads(json.dumps(category, default=str))
-            )
-            category = s_categories.Category(**category)
+            category = decode(s_categories.Category, category)
 
         return category
 
-    def verify_category_record(self, filter: Dict) -> s_categories.Category:
+    async def verify_category_record(
+        self, filter: Dict
+    ) -> s_categories.Category:
         """
         Checks if a category record exists
         in the db using the supplied keys
         """
-        category = self.get_category_record(filter)
+        category = await self.get_category_record(filter)
 
         if category is None:
             raise HTTPException(
@@ -177,9 +191,9 @@ class MongoStorage:
 
         return category
 
-    def update_category_record(self, filter: Dict, update: Dict):
+    async def update_category_record(self, filter: Dict, update: Dict):
         """Updates a category record"""
-        self.verify_category_record(filter)
+        await self.verify_category_record(filter)
 
         for key in ["_id"]:
             if key in update:
@@ -189,29 +203,174 @@ class MongoStorage:
             filter["_id"] = ObjectId(filter["_id"])
         update["date_modified"] = datetime.now(UTC)
 
-        self.db["categories"].update_one(filter, {"$set": update})
+        await self.db["categories"].update_one(filter, {"$set": update})
 
-    def delete_category_record(self, filter: Dict):
+    async def delete_category_record(self, filter: Dict):
         """Deletes a category record by the filter"""
-        self.verify_category_record(filter)
+        await self.verify_category_record(filter)
 
-        self.db["categories"].delete_one(filter)
+        await self.db["categories"].delete_one(filter)
 
     # Reactions
-    def create_reaction_record(
+    async def inc_reaction_counters(
+        self, target_id: str, likes: int, dislikes: int
+    ) -> bool:
+        """
+        Adds the like and dislike deltas of a reaction
+        to the post or comment it targets
+
+        With REACTION_WRITE_BEHIND the deltas are buffered and
+        written by flush_reaction_counters instead.
+
+        Returns:
+            False if the target does not exist
+        """
+        if settings.REACTION_WRITE_BEHIND:
+            collection = await self.get_reaction_target(target_id)
+            if collection is None:
+                return False
+            counter_buffer.add(collection, target_id, likes, dislikes)
+            return True
+
+        date = datetime.now(UTC)
+
+        post = await self.db["posts"].find_one_and_update(
+            {"_id": ObjectId(target_id)},
+            counters_update_pipeline(likes, dislikes, date),
+            projection=TIMELINE_FIELDS,
+            return_document=ReturnDocument.AFTER,
+        )
+        if post is not None:
+            timelines.place(post)
+            await feed_cache.invalidate()
+            return True
+
+        result = await self.db["comments"].update_one(
+            {"_id": ObjectId(target_id)},
+            {
+                "$inc": {"likes": likes, "dislikes": dislikes},
+                "$set": {"date_modified": date},
+            },
+        )
+
+        return result.matched_count > 0
+
+    async def get_reaction_target(self, target_id: str) -> Optional[str]:
+        """
+        Gets the name of the collection holding the post or comment
+        a reaction targets
+
+        Returns:
+            None if the target does not exist
+        """
+        collection = reaction_targets.get(target_id)
+        if collection is not None:
+            return collection
+
+        for collection in ["posts", "comments"]:
+            if await self.db[collection].find_one(
+                {"_id": ObjectId(target_id)}, {"_id": 1}
+            ):
+                reaction_targets.set(target_id, collection)
+                return collection
+
+        return None
+
+    async def flush_reaction_counters(self) -> int:
+        """
+        Writes the buffered reaction counter deltas with one bulk
+        write per collection. Deltas that could not be written are
+        buffered again for the next flush, and the first error is
+        raised once every collection was attempted.
+
+        Deltas rejected with a write error were not applied. On any
+        other failure, such as a network error outliving the driver's
+        retryable write or a cancellation mid write, whether the server
+        applied the write is unknown. Those deltas are buffered again,
+        so counters may be over counted but are never lost.
+
+        Returns:
+            The number of targets updated
+        """
+        deltas = counter_buffer.drain()
+        if not deltas:
+            return 0
+
+        date = datetime.now(UTC)
+        requests = {"posts": [], "comments": []}
+        keys = {"posts": [], "comments": []}
+        for (collection, target_id), (likes, dislikes) in deltas.items():
+            if collection == "posts":
+                update = counters_update_pipeline(likes, dislikes, date)
+            else:
+                update = {
+                    "$inc": {"likes": likes, "dislikes": dislikes},
+                    "$set": {"date_modified": date},
+                }
+            requests[collection].append(
+                UpdateOne({"_id": ObjectId(target_id)}, update)
+            )
+            keys[collection].append((collection, target_id))
+
+        updated = 0
+        errors = []
+        pending = [
+            collection for collection in requests if requests[collection]
+        ]
+        try:
+            while pending:
+                collection = pending[0]
+                failed = keys[collection]
+                try:
+                    result = await self.db[collection].bulk_write(
+                        requests[collection], ordered=False
+                    )
+                    updated += result.matched_count
+                    failed = []
+                except BulkWriteError as ex:
+                    updated += ex.details["nMatched"]
+                    failed = [
+                        keys[collection][error["index"]]
+                        for error in ex.details["writeErrors"]
+                    ]
+                    errors.append(ex)
+                except Exception as ex:
+                    errors.append(ex)
+                finally:
+                    pending.pop(0)
+                    for key in failed:
+                        counter_buffer.add(*key, *deltas[key])
+        finally:
+            # Collections not attempted yet, if the flush was cancelled
+            for collection in pending:
+                for key in keys[collection]:
+                    counter_buffer.add(*key, *deltas[key])
+
+        if requests["posts"]:
+            if len(timelines.lists) > 0:
+                async for post in self.db["posts"].find(
+                    {
+                        "_id": {
+                            "$in": [ObjectId(id) for _, id in keys["posts"]]
+                        }
+                    },
+                    TIMELINE_FIELDS,
+                ):
+                    timelines.place(post)
+            await feed_cache.invalidate()
+
+        if errors:
+            raise errors[0]
+
+        return updated
+
+    async def create_reaction_record(
         self, data: s_reactions.ReactionIn, user_id: str
     ) -> str:
         """Creates a reaction record"""
 
         reactions = self.db["reactions"]
-
-        if reactions.find_one(
-            {"target_id": data.target_id, "user_id": user_id}
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Reaction already exists",
-            )
+        ObjectId(data.target_id)
 
         date = datetime.now(UTC)
         reaction = data.model_dump()
@@ -219,34 +378,85 @@ class MongoStorage:
         reaction["date_created"] = date
         reaction["date_modified"] = date
 
-        post = self.get_post_record({"_id": data.target_id})
-        comment = self.get_comment_record({"_id": data.target_id})
+        try:
+            result = await reactions.update_one(
+                {"target_id": data.target_id, "user_id": user_id},
+                {"$setOnInsert": reaction},
+                upsert=True,
+            )
+            id = result.upserted_id
+        except DuplicateKeyError:
+            id = None
 
-        if not post and not comment:
+        if id is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Target does not exist",
+                detail="Reaction already exists",
             )
-        elif post is not None:
-            if data.is_like:
-                update = {"likes": post.likes + 1}
-            else:
-                update = {"dislikes": post.dislikes + 1}
-            self.update_post_record(filter={"_id": post.id}, update=update)
-        elif comment is not None:
-            if data.is_like:
-                update = {"likes": comment.likes + 1}
-            else:
-                update = {"dislikes": comment.dislikes + 1}
-            self.update_comment_record(
-                filter={"_id": comment.id}, update=update
+
+        likes, dislikes = (1, 0) if data.is_like else (0, 1)
+        if not await self.inc_reaction_counters(
+            data.target_id, likes, dislikes
+        ):
+            await reactions.delete_one({"_id": id})
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Target does not exist",
             )
 
-        id = str(reactions.insert_one(reaction).inserted_id)
+        return str(id)
 
-        return id
+    async def set_reaction_record(
+        self, target_id: str, user_id: str, is_like: bool
+    ) -> str:
+        """
+        Creates or replaces the reaction of a user to a post or comment
+        with a single upsert followed by a single counter update
+        """
+
+        reactions = self.db["reactions"]
+        ObjectId(target_id)
+
+        date = datetime.now(UTC)
+        id = ObjectId()
+        filter = {"target_id": target_id, "user_id": user_id}
+        update = {
+            "$set": {"is_like": is_like, "date_modified": date},
+            "$setOnInsert": {"_id": id, "date_created": date},
+        }
+
+        try:
+            reaction = await reactions.find_one_and_update(
+                filter,
+                update,
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+        except DuplicateKeyError:
+            # A concurrent request inserted the reaction first
+            reaction = await reactions.find_one_and_update(
+                filter, update, return_document=ReturnDocument.BEFORE
+            )
 
-    def get_reaction_record(self, filter: Dict) -> s_reactions.Reaction:
+        if reaction is None:
+            likes, dislikes = (1, 0) if is_like else (0, 1)
+            if not await self.inc_reaction_counters(
+                target_id, likes, dislikes
+            ):
+                await reactions.delete_one({"_id": id})
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Target does not exist",
+                )
+            return str(id)
+
+        if reaction["is_like"] != is_like:
+            delta = 1 if is_like else -1
+            await self.inc_reaction_counters(target_id, delta, -delta)
+
+        return str(reaction["_id"])
+
+    async def get_reaction_record(self, filter: Dict) -> s_reactions.Reaction:
         """Gets a reaction record using the filter"""
 
         reactions = self.db["reactions"]
@@ -254,22 +464,21 @@ class MongoStorage:
         if "_id" in filter and type(filter["_id"]) is str:
             filter["_id"] = ObjectId(filter["_id"])
 
-        reaction = reactions.find_one(filter)
+        reaction = await reactions.find_one(filter)
 
         if reaction:
-            reaction = change_id_key(
-                json.loads(json.dumps(reaction, default=str))
-            )
-            reaction = s_reactions.Reaction(**reaction)
+            reaction = decode(s_reactions.Reaction, reaction)
 
         return reaction
 
-    def verify_reaction_record(self, filter: Dict) -> s_reactions.Reaction:
+    async def verify_reaction_record(
+        self, filter: Dict
+    ) -> s_reactions.Reaction:
         """
         Checks if a reaction record exists
         in the db using the supplied keys
         """
-        reaction = self.get_reaction_record(filter)
+        reaction = await self.get_reaction_record(filter)
 
         if reaction is None:
             raise HTTPException(
@@ -279,9 +488,8 @@ class MongoStorage:
 
         return reaction
 
-    def update_reaction_record(self, filter: Dict, update: Dict):
+    async def update_reaction_record(self, filter: Dict, update: Dict):
         """Updates a reaction record"""
-        reaction = self.verify_reaction_record(filter)
 
         for key in ["_id", "user_id", "target_id"]:
             if key in update:
@@ -291,105 +499,104 @@ class MongoStorage:
             filter["_id"] = ObjectId(filter["_id"])
         update["date_modified"] = datetime.now(UTC)
 
-        self.db["reactions"].update_one(filter, {"$set": update})
-
-        post = self.get_post_record({"_id": reaction.target_id})
-        comment = self.get_comment_record({"_id": reaction.target_id})
+        reaction = await self.db["reactions"].find_one_and_update(
+            filter, {"$set": update}, return_document=ReturnDocument.BEFORE
+        )
 
-        if not post and not comment:
+        if reaction is None:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Target does not exist",
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Reaction not found",
             )
-        elif post is not None:
-            if (
-                not reaction.is_like and update.get("is_like") is True
-            ):  # dislike -> like
-                update = {
-                    "likes": post.likes + 1,
-                    "dislikes": post.dislikes - 1,
-                }
-            elif (
-                reaction.is_like and update.get("is_like") is False
-            ):  # like -> dislike
-                update = {
-                    "likes": post.likes - 1,
-                    "dislikes": post.dislikes + 1,
-                }
-            self.update_post_record(filter={"_id": post.id}, update=update)
-        elif comment is not None:
-            if (
-                not reaction.is_like and update.get("is_like") is True
-            ):  # dislike -> like
-                update = {
-                    "likes": comment.likes + 1,
-                    "dislikes": comment.dislikes - 1,
-                }
-            elif (
-                reaction.is_like and update.get("is_like") is False
-            ):  # like -> dislike
-                update = {
-                    "likes": comment.likes - 1,
-                    "dislikes": comment.dislikes + 1,
-                }
-            self.update_comment_record(
-                filter={"_id": comment.id}, update=update
+
+        is_like = update.get("is_like", reaction["is_like"])
+        if is_like != reaction["is_like"]:
+            delta = 1 if is_like else -1
+            await self.inc_reaction_counters(
+                reaction["target_id"], delta, -delta
             )
 
-    def delete_reaction_record(self, filter: Dict):
+    async def delete_reaction_record(self, filter: Dict):
         """Deletes a reaction record by the filter"""
-        reaction = self.verify_reaction_record(filter)
 
-        post = self.get_post_record({"_id": reaction.target_id})
-        comment = self.get_comment_record({"_id": reaction.target_id})
+        if "_id" in filter and type(filter["_id"]) is str:
+            filter["_id"] = ObjectId(filter["_id"])
+
+        reaction = await self.db["reactions"].find_one_and_delete(filter)
 
-        if not post and not comment:
+        if reaction is None:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Target does not exist",
-            )
-        elif post is not None:
-            if reaction.is_like:
-                update = {"likes": post.likes - 1}
-            else:
-                update = {"dislikes": post.dislikes - 1}
-            self.update_post_record(filter={"_id": post.id}, update=update)
-        elif comment is not None:
-            if reaction.is_like:
-                update = {"likes": comment.likes - 1}
-            else:
-                update = {"dislikes": comment.dislikes - 1}
-            self.update_comment_record(
-                filter={"_id": comment.id}, update=update
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Reaction not found",
             )
 
-        self.db["reactions"].delete_one(filter)
+        likes, dislikes = (-1, 0) if reaction["is_like"] else (0, -1)
+        await self.inc_reaction_counters(
+            reaction["target_id"], likes, dislikes
+        )
+
+    async def get_user_reaction_records(
+        self, user_id: str, target_ids: List[str]
+    ) -> Dict[str, s_reactions.Reaction]:
+        """
+        Gets the reactions of a user to a set of posts and comments
+        with a single query
+
+        Returns:
+            The reactions keyed by their target id. Targets the user
+            has not reacted to are left out.
+        """
+        reactions = self.db["reactions"].find(
+            {"user_id": user_id, "target_id": {"$in": target_ids}}
+        )
+
+        return {
+            reaction.target_id: reaction
+            for reaction in decode_many(
+                s_reactions.Reaction, await reactions.to_list(None)
+            )
+        }
 
     # Posts
-    def create_post_record(self, data: s_posts.PostIn, user_id: str) -> str:
-        """Creates a post record"""
+    async def create_post_record(
+        self,
+        data: s_posts.PostIn,
+        user_id: str,
+        id: Optional[ObjectId] = None,
+        post_image_url: Optional[str] = None,
+    ) -> str:
+        """
+        Creates a post record. The id can be allocated beforehand
+        so that files named after the post are stored before it.
+        """
 
         posts = self.db["posts"]
 
-        self.verify_category_record(
+        await self.verify_category_record(
             {"_id": data.category_id, "topics": data.category_topic}
         )
 
         date = datetime.now(UTC)
         post = data.model_dump()
+        if id is not None:
+            post["_id"] = id
         post["user_id"] = user_id
-        post["post_image_url"] = None
+        post["post_image_url"] = post_image_url
+        post["image_variants"] = None
         post["likes"] = 0
         post["dislikes"] = 0
         post["comments"] = 0
+        post.update(score_fields(0, 0, date))
         post["date_created"] = date
         post["date_modified"] = date
 
-        id = str(posts.insert_one(post).inserted_id)
+        id = str((await posts.insert_one(post)).inserted_id)
+        timelines.place(post)
+        await feed_cache.invalidate()
 
         return id
 
-    def get_post_record(self, filter: Dict) -> s_posts.Post:
+    async def get_post_record(self, filter: Dict) -> s_posts.Post:
         """Gets a post record using the filter"""
 
         posts = self.db["posts"]
@@ -397,20 +604,19 @@ class MongoStorage:
         if "_id" in filter and type(filter["_id"]) is str:
             filter["_id"] = ObjectId(filter["_id"])
 
-        post = posts.find_one(filter)
+        post = await posts.find_one(filter)
 
         if post:
-            post = change_id_key(json.loads(json.dumps(post, default=str)))
-            post = s_posts.Post(**post)
+            post = decode(s_posts.Post, post)
 
         return post
 
-    def verify_post_record(self, filter: Dict) -> s_posts.Post:
+    async def verify_post_record(self, filter: Dict) -> s_posts.Post:
         """
         Checks if a post record exists
         in the db using the supplied keys
         """
-        post = self.get_post_record(filter)
+        post = await self.get_post_record(filter)
 
         if post is None:
             raise HTTPException(
@@ -420,42 +626,157 @@ class MongoStorage:
 
         return post
 
-    def update_post_record(self, filter: Dict, update: Dict):
+    async def update_post_record(self, filter: Dict, update: Dict):
         """Updates a post record"""
-        self.verify_post_record(filter)
+        post = await self.verify_post_record(filter)
 
         for key in [
             "_id",
             "user_id",
             "category_id",
+            "net_votes",
+            "hot_score",
         ]:
             if key in update:
                 raise KeyError(f"Invalid Key. KEY {key} cannot be changed")
 
+        scores = None
+        if "likes" in update or "dislikes" in update:
+            scores = score_fields(
+                update.get("likes", post.likes),
+                update.get("dislikes", post.dislikes),
+                post.date_created,
+            )
+            update.update(scores)
+
         if "_id" in filter and type(filter["_id"]) is str:
             filter["_id"] = ObjectId(filter["_id"])
         update["date_modified"] = datetime.now(UTC)
 
-        self.db["posts"].update_one(filter, {"$set": update})
+        await self.db["posts"].update_one(filter, {"$set": update})
+        if scores is not None:
+            timelines.place(
+                {
+                    "_id": post.id,
+                    "category_id": post.category_id,
+                    "date_created": post.date_created,
+                    **scores,
+                }
+            )
+        await feed_cache.invalidate()
 
-    def delete_post_record(self, filter: Dict):
+    async def refresh_post_scores(self, filter: Optional[Dict] = None) -> int:
+        """
+        Recomputes the materialized score fields of the posts
+        matching the filter from their stored likes and dislikes
+        """
+        result = await self.db["posts"].update_many(
+            filter or {}, [{"$set": score_fields_expression()}]
+        )
+        if result.modified_count > 0:
+            timelines.clear()
+
+        return result.modified_count
+
+    async def backfill_comment_counters(self) -> Dict[str, int]:
+        """
+        Recounts the comments of every post and the replies of every
+        comment, fixing the counters that disagree. Comments created
+        while it runs may be counted twice or not at all, so run it
+        during a quiet period.
+
+        Returns:
+            The number of posts and comments fixed
+        """
+        comments = self.db["comments"]
+        fixed = {}
+
+        for collection, field, group_key in [
+            ("posts", "comments", "$post_id"),
+            ("comments", "replies", "$reply_to_id"),
+        ]:
+            counts = {
+                group["_id"]: group["count"]
+                async for group in comments.aggregate(
+                    [
+                        {"$match": {group_key[1:]: {"$ne": None}}},
+                        {"$group": {"_id": group_key, "count": {"$sum": 1}}},
+                    ]
+                )
+            }
+
+            updates = []
+            fixed[collection] = 0
+            async for document in self.db[collection].find({}, {field: 1}):
+                count = counts.get(str(document["_id"]), 0)
+                if document.get(field) != count:
+                    updates.append(
+                        UpdateOne(
+                            {"_id": document["_id"]}, {"$set": {field: count}}
+                        )
+                    )
+
+                if len(updates) == 1000:
+                    await self.db[collection].bulk_write(updates)
+                    fixed[collection] += len(updates)
+                    updates = []
+
+            if updates:
+                await self.db[collection].bulk_write(updates)
+                fixed[collection] += len(updates)
+
+        await feed_cache.invalidate()
+
+        return fixed
+
+    async def get_post_image_urls(self) -> Set[str]:
+        """Gets the urls of the images of every post"""
+        cursor = self.db["posts"].find(
+            {"post_image_url": {"$type": "string"}},
+            {"_id": 0, "post_image_url": 1},
+        )
+
+        return {post["post_image_url"] async for post in cursor}
+
+    async def delete_post_record(self, filter: Dict):
         """Deletes a post record by the filter"""
-        self.verify_post_record(filter)
+        post = await self.verify_post_record(filter)
 
-        self.db["posts"].delete_one(filter)
+        await self.db["posts"].delete_one(filter)
+        reaction_targets.pop(post.id)
+        timelines.remove(post.id, post.category_id)
+        await feed_cache.invalidate()
 
     # Comments
-    def create_comment_record(
+    async def create_comment_record(
         self,
         data: s_comments.CommentIn,
         post_id: str,
         user_id: str,
     ) -> str:
-        """Creates a comment record"""
+        """
+        Creates a comment record and increments the comment count
+        of its post and the reply count of the comment it replies to
+        """
 
         comments = self.db["comments"]
+        posts = self.db["posts"]
 
-        self.verify_post_record({"_id": post_id})
+        # Ids are validated before any write so a malformed one cannot
+        # leave a counter or comment behind
+        post_object_id = ObjectId(post_id)
+        reply_to_object_id = None
+        if data.reply_to_id is not None:
+            reply_to_object_id = ObjectId(data.reply_to_id)
+
+        result = await posts.update_one(
+            {"_id": post_object_id}, {"$inc": {"comments": 1}}
+        )
+        if result.matched_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Post not found",
+            )
 
         date = datetime.now(UTC)
         comment = data.model_dump()
@@ -464,14 +785,37 @@ class MongoStorage:
         # comment["reply_to_id"] = reply_to_id
         comment["likes"] = 0
         comment["dislikes"] = 0
+        comment["replies"] = 0
         comment["date_created"] = date
         comment["date_modified"] = date
 
-        id = str(comments.insert_one(comment).inserted_id)
+        id = None
+        try:
+            id = (await comments.insert_one(comment)).inserted_id
+
+            if reply_to_object_id is not None:
+                result = await comments.update_one(
+                    {"_id": reply_to_object_id, "post_id": post_id},
+                    {"$inc": {"replies": 1}},
+                )
+                if result.matched_count == 0:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Replied comment does not exist",
+                    )
+        except Exception:
+            if id is not None:
+                await comments.delete_one({"_id": id})
+            await posts.update_one(
+                {"_id": post_object_id}, {"$inc": {"comments": -1}}
+            )
+            raise
 
-        return id
+        await feed_cache.invalidate()
 
-    def get_comment_record(self, filter: Dict) -> s_comments.Comment:
+        return str(id)
+
+    async def get_comment_record(self, filter: Dict) -> s_comments.Comment:
         """Gets a comment record using the filter"""
 
         comments = self.db["comments"]
@@ -479,22 +823,19 @@ class MongoStorage:
         if "_id" in filter and type(filter["_id"]) is str:
             filter["_id"] = ObjectId(filter["_id"])
 
-        comment = comments.find_one(filter)
+        comment = await comments.find_one(filter)
 
         if comment:
-            comment = change_id_key(
-                json.loads(json.dumps(comment, default=str))
-            )
-            comment = s_comments.Comment(**comment)
+            comment = decode(s_comments.Comment, comment)
 
         return comment
 
-    def verify_comment_record(self, filter: Dict) -> s_comments.Comment:
+    async def verify_comment_record(self, filter: Dict) -> s_comments.Comment:
         """
         Checks if a comment record exists
         in the db using the supplied keys
         """
-        comment = self.get_comment_record(filter)
+        comment = await self.get_comment_record(filter)
 
         if comment is None:
             raise HTTPException(
@@ -504,9 +845,9 @@ class MongoStorage:
 
         return comment
 
-    def update_comment_record(self, filter: Dict, update: Dict):
+    async def update_comment_record(self, filter: Dict, update: Dict):
         """Updates a comment record"""
-        self.verify_comment_record(filter)
+        await self.verify_comment_record(filter)
 
         for key in [
             "_id",
@@ -521,13 +862,13 @@ class MongoStorage:
             filter["_id"] = ObjectId(filter["_id"])
         update["date_modified"] = datetime.now(UTC)
 
-        self.db["comments"].update_one(filter, {"$set": update})
+        await self.db["comments"].update_one(filter, {"$set": update})
 
-    def delete_comment_record(self, filter: Dict):
+    async def delete_comment_record(self, filter: Dict):
         """Deletes a comment record by the filter"""
         # Don't Delete Comment Record due to replies
-        self.verify_comment_record(filter)
+        await self.verify_comment_record(filter)
         update = {"content": "REMOVED", "user_id": "REMOVED"}
-        self.update_comment_record(filter=filter, update=update)
+        await self.update_comment_record(filter=filter, update=update)
 
-        # self.db["comments"].delete_one(filter)
+        # await self.db["comments"].delete_one(filter)
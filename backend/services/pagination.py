@@ -0,0 +1,100 @@
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+invalid_cursor_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid cursor",
+)
+
+
+def encode_cursor(document: Dict[str, Any], sort_field: Optional[str]) -> str:
+    """
+    Encodes the position of a document in a
+    listing sorted by sort_field then _id
+    """
+    value = document.get(sort_field) if sort_field else None
+    data = json_util.dumps([sort_field, value, document["_id"]])
+
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, sort_field: Optional[str]
+) -> Tuple[Any, ObjectId]:
+    """Decodes a cursor into the sort value and _id it points after"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        data = base64.urlsafe_b64decode(cursor + padding)
+        field, value, id = json_util.loads(data)
+    except (binascii.Error, ValueError, TypeError, InvalidId):
+        raise invalid_cursor_exception
+
+    if field != sort_field or not isinstance(id, ObjectId):
+        raise invalid_cursor_exception
+
+    return value, id
+
+
+def keyset_filter(
+    cursor: str, sort_field: Optional[str], descending: bool = True
+) -> Dict[str, Any]:
+    """Gets the filter matching the documents after the cursor"""
+    value, id = decode_cursor(cursor, sort_field)
+    op = "$lt" if descending else "$gt"
+
+    if sort_field is None:
+        return {"_id": {op: id}}
+
+    return {
+        "$or": [
+            {sort_field: {op: value}},
+            {sort_field: value, "_id": {op: id}},
+        ]
+    }
+
+
+async def find_page(
+    collection: AsyncIOMotorCollection,
+    filter: Dict[str, Any],
+    sort_field: Optional[str],
+    cursor: Optional[str],
+    page_size: int,
+    descending: bool = True,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Gets a page of documents sorted by sort_field then _id.
+    Pages are located with an index range on the sort keys
+    so every page costs the same regardless of its depth.
+
+    Returns:
+        The page documents and the cursor of the next page
+    """
+    if cursor is not None:
+        keyset = keyset_filter(cursor, sort_field, descending)
+        filter = {"$and": [filter, keyset]} if filter else keyset
+
+    direction = -1 if descending else 1
+    sort = {"_id": direction}
+    if sort_field is not None:
+        sort = {sort_field: direction, "_id": direction}
+
+    documents = (
+        await collection.find(filter)
+        .sort(sort)
+        .limit(page_size + 1)
+        .to_list(length=page_size + 1)
+    )
+
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        next_cursor = encode_cursor(documents[-1], sort_field)
+
+    return documents, next_cursor
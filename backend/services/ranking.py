@@ -0,0 +1,87 @@
+import math
+from datetime import UTC, datetime
+from typing import Any, Dict, List
+
+from schemas.posts import PostSortTypes
+
+# Hot scores are anchored to the post creation time instead of its age,
+# so a stored score stays comparable with newer ones and never has to be
+# recomputed as time passes. Every HOT_DECAY_SECONDS a new post needs ten
+# times the net votes of an older one to outrank it.
+HOT_EPOCH = datetime(2024, 1, 1, tzinfo=UTC)
+HOT_DECAY_SECONDS = 45000
+
+FEED_SORT_FIELDS = {
+    PostSortTypes.NEW: "date_created",
+    PostSortTypes.TOP: "net_votes",
+    PostSortTypes.HOT: "hot_score",
+}
+
+
+def hot_score(likes: int, dislikes: int, date_created: datetime) -> float:
+    """Computes the hot score of a post"""
+    net_votes = likes - dislikes
+    sign = (net_votes > 0) - (net_votes < 0)
+    order = math.log10(max(abs(net_votes), 1))
+
+    if date_created.tzinfo is None:
+        date_created = date_created.replace(tzinfo=UTC)
+    seconds = (date_created - HOT_EPOCH).total_seconds()
+
+    return sign * order + seconds / HOT_DECAY_SECONDS
+
+
+def score_fields(
+    likes: int, dislikes: int, date_created: datetime
+) -> Dict[str, Any]:
+    """Gets the materialized score fields of a post"""
+    return {
+        "net_votes": likes - dislikes,
+        "hot_score": hot_score(likes, dislikes, date_created),
+    }
+
+
+def score_fields_expression() -> Dict[str, Any]:
+    """
+    Gets the aggregation expressions computing the materialized
+    score fields of a post from its stored likes and dislikes
+    """
+    net_votes = {"$subtract": ["$likes", "$dislikes"]}
+    sign = {
+        "$cond": [
+            {"$gt": [net_votes, 0]},
+            1,
+            {"$cond": [{"$lt": [net_votes, 0]}, -1, 0]},
+        ]
+    }
+    order = {"$log10": {"$max": [{"$abs": net_votes}, 1]}}
+    seconds = {"$divide": [{"$subtract": ["$date_created", HOT_EPOCH]}, 1000]}
+
+    return {
+        "net_votes": net_votes,
+        "hot_score": {
+            "$add": [
+                {"$multiply": [sign, order]},
+                {"$divide": [seconds, HOT_DECAY_SECONDS]},
+            ]
+        },
+    }
+
+
+def counters_update_pipeline(
+    likes: int, dislikes: int, date_modified: datetime
+) -> List[Dict[str, Any]]:
+    """
+    Gets the update pipeline adding like and dislike deltas to a post
+    and recomputing its score fields in the same atomic write
+    """
+    return [
+        {
+            "$set": {
+                "likes": {"$add": ["$likes", likes]},
+                "dislikes": {"$add": ["$dislikes", dislikes]},
+                "date_modified": date_modified,
+            }
+        },
+        {"$set": score_fields_expression()},
+    ]
@@ -0,0 +1,52 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from services.pagination import encode_cursor, keyset_filter
+
+SCORE_FIELD = "score"
+
+
+async def search_page(
+    collection: AsyncIOMotorCollection,
+    query: str,
+    filter: Dict[str, Any],
+    cursor: Optional[str],
+    page_size: int,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Gets a page of the documents matching a text search, most
+    relevant first. Pages are located by relevance score then _id,
+    so cursors stay stable while documents are added.
+
+    Args:
+        collection: a collection with a text index
+        query: the search terms
+        filter: further equality filters on the documents
+        cursor: the cursor of the page
+        page_size: the number of documents in a page
+
+    Returns:
+        The page documents with their score and the cursor of the
+        next page
+    """
+    pipeline = [
+        {"$match": {"$text": {"$search": query}, **filter}},
+        {"$addFields": {SCORE_FIELD: {"$meta": "textScore"}}},
+    ]
+    if cursor is not None:
+        pipeline.append({"$match": keyset_filter(cursor, SCORE_FIELD)})
+    pipeline += [
+        {"$sort": {SCORE_FIELD: -1, "_id": -1}},
+        {"$limit": page_size + 1},
+    ]
+
+    documents = await collection.aggregate(pipeline).to_list(
+        length=page_size + 1
+    )
+
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        next_cursor = encode_cursor(documents[-1], SCORE_FIELD)
+
+    return documents, next_cursor
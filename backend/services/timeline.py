@@ -0,0 +1,263 @@
+import asyncio
+import heapq
+from bisect import bisect_left, insort
+from datetime import UTC, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from core.cache import TTLCache
+from core.config import settings
+from motor.motor_asyncio import AsyncIOMotorCollection
+from schemas.posts import PostSortTypes
+from services.pagination import decode_cursor, encode_cursor, find_page
+from services.ranking import FEED_SORT_FIELDS
+
+# Fields of a post the timelines are built from
+TIMELINE_FIELDS = {
+    "category_id": 1,
+    "date_created": 1,
+    "net_votes": 1,
+    "hot_score": 1,
+}
+
+# Position of a post in a timeline: its sort value then its id,
+# compared the same way as the feed sort keys
+TimelineKey = Tuple[Any, str]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def sort_value(value: Any) -> Any:
+    """
+    Gets a sort value in a form that compares the same whether it
+    comes from the db, a cursor or a post created in this process
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=UTC)
+        return (value - EPOCH) // timedelta(milliseconds=1)
+
+    return value
+
+
+class CategoryTimeline:
+    """
+    The top posts of a category, or of all posts, in one sort order,
+    kept as ascending keys so posts can be placed with a binary search
+    """
+
+    def __init__(self, size: int, keys: List[TimelineKey]) -> None:
+        self.size = size
+        self.keys = sorted(keys)
+        self.positions = {key[1]: key for key in self.keys}
+        # Whether posts that did not fit were left out
+        self.truncated = len(self.keys) >= size
+
+    def place(self, id: str, value: Any) -> None:
+        """Adds a post or moves it to its new position"""
+        self.remove(id)
+
+        key = (sort_value(value), id)
+        if self.truncated and self.keys and key < self.keys[0]:
+            return
+
+        insort(self.keys, key)
+        self.positions[id] = key
+
+        if len(self.keys) > self.size:
+            _, dropped = self.keys.pop(0)
+            del self.positions[dropped]
+            self.truncated = True
+
+    def remove(self, id: str) -> None:
+        """Removes a post if it is in the timeline"""
+        key = self.positions.pop(id, None)
+        if key is not None:
+            del self.keys[bisect_left(self.keys, key)]
+
+    def after(self, key: Optional[TimelineKey]) -> Iterable[TimelineKey]:
+        """Iterates over the keys after a key, highest first"""
+        end = len(self.keys) if key is None else bisect_left(self.keys, key)
+
+        return (self.keys[i] for i in range(end - 1, -1, -1))
+
+
+class Timelines:
+    """
+    Bounded top-K post lists per category and sort order. A user feed
+    page is a k-way merge of the lists of the subscribed categories
+    followed by one fetch of the page posts by id, so its cost does not
+    grow with the number or size of the categories.
+
+    Lists are loaded from the db on first use and kept up to date by
+    the writes of this process. Writes made by other processes show up
+    once a list expires.
+    """
+
+    def __init__(self, size: int, maxsize: int, ttl: float) -> None:
+        self.size = size
+        self.lists = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(
+        self,
+        collection: AsyncIOMotorCollection,
+        category_id: Optional[str],
+        sort_by: PostSortTypes,
+    ) -> CategoryTimeline:
+        """Gets the timeline of a category, or of all posts if None"""
+        timeline = self.lists.get((category_id, sort_by))
+        if timeline is not None:
+            return timeline
+
+        sort_field = FEED_SORT_FIELDS[sort_by]
+        filter = {} if category_id is None else {"category_id": category_id}
+        documents = (
+            await collection.find(filter, {sort_field: 1})
+            .sort({sort_field: -1, "_id": -1})
+            .limit(self.size)
+            .to_list(length=self.size)
+        )
+
+        timeline = CategoryTimeline(
+            self.size,
+            [
+                (sort_value(document.get(sort_field)), str(document["_id"]))
+                for document in documents
+            ],
+        )
+        self.lists.set((category_id, sort_by), timeline)
+
+        return timeline
+
+    def place(self, post: Dict[str, Any]) -> None:
+        """
+        Adds a post to, or moves it within, the loaded timelines of its
+        category and of all posts. Writes do not count as cache lookups,
+        so the cache stats and eviction order reflect feed reads only.
+        """
+        id = str(post["_id"])
+
+        for category_id in [post["category_id"], None]:
+            for sort_by, sort_field in FEED_SORT_FIELDS.items():
+                timeline = self.lists.peek((category_id, sort_by))
+                if timeline is not None:
+                    timeline.place(id, post[sort_field])
+
+    def remove(self, id: str, category_id: str) -> None:
+        """Removes a post from the loaded timelines"""
+        for list_category_id in [category_id, None]:
+            for sort_by in FEED_SORT_FIELDS.keys():
+                timeline = self.lists.peek((list_category_id, sort_by))
+                if timeline is not None:
+                    timeline.remove(id)
+
+    def clear(self) -> None:
+        """Drops every loaded timeline"""
+        self.lists.clear()
+
+    async def merge_page(
+        self,
+        collection: AsyncIOMotorCollection,
+        category_ids: List[Optional[str]],
+        sort_by: PostSortTypes,
+        cursor: Optional[str],
+        page_size: int,
+    ) -> Optional[Tuple[List[ObjectId], bool]]:
+        """
+        Gets the ids of a feed page of the posts of the categories
+
+        Returns:
+            The page post ids and whether a page follows, or None if
+            the page goes past the posts held by the timelines
+        """
+        sort_field = FEED_SORT_FIELDS[sort_by]
+        start = None
+        if cursor is not None:
+            value, id = decode_cursor(cursor, sort_field)
+            start = (sort_value(value), str(id))
+
+        timelines = await asyncio.gather(
+            *[
+                self.get(collection, category_id, sort_by)
+                for category_id in set(category_ids)
+            ]
+        )
+
+        # Below the lowest key of a truncated timeline, posts left
+        # out of it could belong on the page
+        floor = max(
+            (
+                timeline.keys[0]
+                for timeline in timelines
+                if timeline.truncated and timeline.keys
+            ),
+            default=None,
+        )
+
+        ids = []
+        for key in heapq.merge(
+            *[timeline.after(start) for timeline in timelines], reverse=True
+        ):
+            if floor is not None and key < floor:
+                break
+            ids.append(ObjectId(key[1]))
+            if len(ids) > page_size:
+                return ids[:page_size], True
+
+        if floor is not None:
+            return None
+
+        return ids, False
+
+    async def find_page(
+        self,
+        collection: AsyncIOMotorCollection,
+        category_ids: List[Optional[str]],
+        sort_by: PostSortTypes,
+        cursor: Optional[str],
+        page_size: int,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Gets a feed page of the posts of the categories, or of all
+        posts for the category None. Pages past the timelines are
+        read with an index range like any other feed page.
+
+        Returns:
+            The page documents and the cursor of the next page
+        """
+        sort_field = FEED_SORT_FIELDS[sort_by]
+        page = await self.merge_page(
+            collection, category_ids, sort_by, cursor, page_size
+        )
+
+        if page is None:
+            filter = {}
+            if None not in category_ids:
+                filter = {"category_id": {"$in": category_ids}}
+            return await find_page(
+                collection,
+                filter,
+                sort_field=sort_field,
+                cursor=cursor,
+                page_size=page_size,
+            )
+
+        ids, has_next = page
+        documents = {
+            document["_id"]: document
+            async for document in collection.find({"_id": {"$in": ids}})
+        }
+        documents = [documents[id] for id in ids if id in documents]
+
+        next_cursor = None
+        if has_next and documents:
+            next_cursor = encode_cursor(documents[-1], sort_field)
+
+        return documents, next_cursor
+
+
+timelines = Timelines(
+    size=settings.TIMELINE_SIZE,
+    maxsize=settings.TIMELINE_MAX_LISTS,
+    ttl=settings.TIMELINE_TTL_SECONDS,
+)
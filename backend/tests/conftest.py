@@ -0,0 +1,8 @@
+import os
+
+# Settings are read on import, so they are set before any app module
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_DAYS", "7")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MAIL_WORKER_ENABLED", "false")
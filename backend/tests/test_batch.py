@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from bson.objectid import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+from services.batch import find_by_ids
+
+
+@pytest.fixture
+def collection():
+    collection = AsyncMongoMockClient()["test"]["posts"]
+    asyncio.run(collection.insert_many([{"n": n} for n in range(3)]))
+
+    return collection
+
+
+def ids_of(collection):
+    documents = collection.find().sort("n")
+    return [document["_id"] for document in asyncio.run(documents.to_list())]
+
+
+def test_documents_keep_the_requested_order(collection):
+    first, second, third = map(str, ids_of(collection))
+    unknown = str(ObjectId())
+
+    found, missing = asyncio.run(
+        find_by_ids(collection, [third, "bad", first, unknown, third])
+    )
+
+    assert [document["n"] for document in found] == [2, 0]
+    assert missing == ["bad", unknown]
+
+
+def test_uppercase_ids_find_their_documents(collection):
+    first, second, _ = map(str, ids_of(collection))
+
+    found, missing = asyncio.run(
+        find_by_ids(collection, [second.upper(), first, second])
+    )
+
+    assert [document["n"] for document in found] == [1, 0]
+    assert missing == []
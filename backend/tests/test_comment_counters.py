@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from core.storage import storage
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+from schemas.comments import CommentIn
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(storage, "db", db)
+    post_id = asyncio.run(db["posts"].insert_one({"comments": 0})).inserted_id
+
+    return db, str(post_id)
+
+
+def counts(db):
+    post = asyncio.run(db["posts"].find_one())
+    return post["comments"], asyncio.run(db["comments"].count_documents({}))
+
+
+def test_malformed_reply_id_writes_nothing(db):
+    db, post_id = db
+    data = CommentIn(content="hi", reply_to_id="not-an-id")
+
+    with pytest.raises(InvalidId):
+        asyncio.run(storage.create_comment_record(data, post_id, "user"))
+
+    assert counts(db) == (0, 0)
+
+
+def test_missing_replied_comment_is_rolled_back(db):
+    db, post_id = db
+    data = CommentIn(content="hi", reply_to_id=str(ObjectId()))
+
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(storage.create_comment_record(data, post_id, "user"))
+
+    assert info.value.status_code == 400
+    assert counts(db) == (0, 0)
+
+
+def test_reply_increments_counters(db):
+    db, post_id = db
+    parent = asyncio.run(
+        storage.create_comment_record(CommentIn(content="a"), post_id, "u")
+    )
+    asyncio.run(
+        storage.create_comment_record(
+            CommentIn(content="b", reply_to_id=parent), post_id, "u"
+        )
+    )
+
+    assert counts(db) == (2, 2)
+    replied = asyncio.run(db["comments"].find_one({"_id": ObjectId(parent)}))
+    assert replied["replies"] == 1
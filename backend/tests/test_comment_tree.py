@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+from api.v1.routers.comments import get_comment_tree
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from core.storage import storage
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(storage, "db", db)
+
+    return db
+
+
+def test_unknown_post_is_not_found(db):
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(get_comment_tree(str(ObjectId()), depth=1, breadth=1))
+
+    assert info.value.status_code == 404
+
+
+def test_malformed_post_id_is_rejected(db):
+    with pytest.raises(InvalidId):
+        asyncio.run(get_comment_tree("not-an-id", depth=1, breadth=1))
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from bson.objectid import ObjectId
+from core.storage import storage
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import BulkWriteError
+from services.counter_buffer import counter_buffer
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(storage, "db", db)
+    counter_buffer.drain()
+
+    yield db
+
+    counter_buffer.drain()
+
+
+def fail_posts_bulk_write(db, monkeypatch, error):
+    collection_class = type(db["posts"])
+    bulk_write = collection_class.bulk_write
+
+    async def failing_bulk_write(self, operations, **kwargs):
+        if self.name == "posts":
+            raise error
+        return await bulk_write(self, operations, **kwargs)
+
+    monkeypatch.setattr(collection_class, "bulk_write", failing_bulk_write)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        BulkWriteError(
+            {
+                "nMatched": 0,
+                "writeErrors": [{"index": 0, "code": 1, "errmsg": "x"}],
+            }
+        ),
+        ConnectionError("connection reset"),
+    ],
+)
+def test_flush_keeps_deltas_of_every_collection(db, monkeypatch, error):
+    post_id, comment_id = str(ObjectId()), str(ObjectId())
+    asyncio.run(db["comments"].insert_one({"_id": ObjectId(comment_id)}))
+    counter_buffer.add("posts", post_id, 1, 0)
+    counter_buffer.add("comments", comment_id, 5, 0)
+
+    fail_posts_bulk_write(db, monkeypatch, error)
+    with pytest.raises(type(error)):
+        asyncio.run(storage.flush_reaction_counters())
+
+    # The failed post delta is kept and the comment batch still written
+    assert counter_buffer.drain() == {("posts", post_id): [1, 0]}
+    comment = asyncio.run(db["comments"].find_one())
+    assert comment["likes"] == 5
+
+
+def test_flush_keeps_deltas_not_attempted_when_cancelled(db, monkeypatch):
+    post_id, comment_id = str(ObjectId()), str(ObjectId())
+    counter_buffer.add("posts", post_id, 1, 0)
+    counter_buffer.add("comments", comment_id, 5, 0)
+
+    fail_posts_bulk_write(db, monkeypatch, asyncio.CancelledError())
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(storage.flush_reaction_counters())
+
+    assert counter_buffer.drain() == {
+        ("posts", post_id): [1, 0],
+        ("comments", comment_id): [5, 0],
+    }
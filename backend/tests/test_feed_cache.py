@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from core.config import settings
+from schemas.posts import PostSortTypes
+from services.feed_cache import (
+    FeedCache,
+    FeedCacheBackend,
+    MemoryFeedCacheBackend,
+    create_feed_cache,
+)
+
+
+@pytest.fixture
+def cache():
+    return FeedCache(
+        backend=MemoryFeedCacheBackend(maxsize=100),
+        max_pages=3,
+        ttls={sort_by: 60 for sort_by in PostSortTypes},
+    )
+
+
+async def cache_page(cache, sort_by, cursor=None, next_cursor=None):
+    key = await cache.key(sort_by, ("anonymous",), cursor, 10)
+    await cache.set(key, b"page", next_cursor)
+    return key
+
+
+def test_invalidate_drops_pages_of_the_sort_types(cache):
+    async def run():
+        await cache_page(cache, PostSortTypes.NEW, next_cursor="next")
+        await cache_page(cache, PostSortTypes.HOT)
+        await cache.invalidate()
+
+        new = await cache.key(PostSortTypes.NEW, ("anonymous",), None, 10)
+        hot = await cache.key(PostSortTypes.HOT, ("anonymous",), None, 10)
+        deeper = await cache.key(PostSortTypes.NEW, ("anonymous",), "next", 10)
+        return await cache.get(new), await cache.get(hot), deeper
+
+    new, hot, deeper = asyncio.run(run())
+
+    assert new is None
+    assert hot == b"page"
+    assert deeper is None
+
+
+def test_pages_deeper_than_max_pages_are_not_cached(cache):
+    async def run():
+        cursors = [None, "1", "2", "3"]
+        keys = []
+        for cursor, next_cursor in zip(cursors, cursors[1:] + [None]):
+            keys.append(
+                await cache_page(cache, PostSortTypes.NEW, cursor, next_cursor)
+            )
+        return keys
+
+    keys = asyncio.run(run())
+
+    assert [key is not None for key in keys] == [True, True, True, False]
+
+
+def test_incomplete_backend_fails_when_built():
+    class IncompleteBackend(FeedCacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()
+
+
+def test_memory_backend_without_url(monkeypatch):
+    monkeypatch.setattr(settings, "FEED_CACHE_URL", None)
+
+    cache = create_feed_cache()
+
+    assert isinstance(cache.backend, MemoryFeedCacheBackend)
+
+
+def test_redis_backend_with_url(monkeypatch):
+    pytest.importorskip("redis")
+    from services.feed_cache import RedisFeedCacheBackend
+
+    monkeypatch.setattr(settings, "FEED_CACHE_URL", "redis://localhost:6379")
+
+    cache = create_feed_cache()
+
+    assert isinstance(cache.backend, RedisFeedCacheBackend)
@@ -0,0 +1,139 @@
+import asyncio
+import socket
+from datetime import UTC, datetime
+
+import pytest
+from aiosmtpd.controller import Controller
+from core.config import settings
+from mongomock_motor import AsyncMongoMockClient
+from services.mail_outbox import MailOutbox
+
+
+class Handler:
+    """
+    SMTP stand-in that accepts mail, refuses rejected@ recipients and
+    drops the connection while receiving mail for dropped@
+    """
+
+    def __init__(self):
+        self.received = []
+
+    async def handle_RCPT(
+        self, server, session, envelope, address, rcpt_options
+    ):
+        if address.startswith("rejected@"):
+            return "550 5.1.1 Mailbox unavailable"
+
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if envelope.rcpt_tos[0].startswith("dropped@"):
+            server.transport.close()
+            return "250 OK"
+
+        self.received.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+
+    monkeypatch.setattr(settings, "SMTP_HOST", controller.hostname)
+    monkeypatch.setattr(settings, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(settings, "SMTP_USE_SSL", False)
+    monkeypatch.setattr(settings, "EMAIL_ACCOUNT", "buzzboard@example.com")
+    monkeypatch.setattr(settings, "EMAIL_PASSWORD", None)
+    monkeypatch.setattr(settings, "MAIL_MAX_ATTEMPTS", 8)
+
+    yield handler
+
+    controller.stop()
+
+
+async def deliver_batch(receivers):
+    outbox = MailOutbox(AsyncMongoMockClient()["test"]["mail_outbox"])
+    for receiver in receivers:
+        await outbox.enqueue("Subject", "<p>Body</p>", receiver)
+
+    try:
+        claimed = await outbox.claim(10)
+        sent = await outbox.deliver(claimed)
+        reclaimed = await outbox.claim(10)
+    finally:
+        outbox.sender.close()
+
+    messages = await outbox.collection.find().to_list(length=None)
+
+    return sent, reclaimed, {m["receiver_email"]: m for m in messages}
+
+
+def test_deliver_records_each_outcome(smtp_server):
+    receivers = [
+        "ok@example.com",
+        "rejected@example.com",
+        "dropped@example.com",
+        "after@example.com",
+    ]
+
+    sent, reclaimed, messages = asyncio.run(deliver_batch(receivers))
+
+    assert sent == 1
+    assert smtp_server.received == ["ok@example.com"]
+
+    assert messages["ok@example.com"]["status"] == "sent"
+    assert messages["ok@example.com"]["date_sent"] is not None
+
+    # A rejected message is retried later without stopping the batch
+    rejected = messages["rejected@example.com"]
+    assert rejected["status"] == "pending"
+    assert rejected["last_error"].startswith("SMTPRecipientsRefused")
+
+    # Once the connection drops, even after the one reconnect, the rest
+    # of the batch is left for a later attempt with the same error
+    dropped = messages["dropped@example.com"]
+    after = messages["after@example.com"]
+    assert dropped["status"] == after["status"] == "pending"
+    assert dropped["last_error"].startswith("SMTPServerDisconnected")
+    assert after["last_error"] == dropped["last_error"]
+
+    # Failed messages back off instead of being claimed again at once
+    assert reclaimed == []
+    now = datetime.now(UTC)
+    for receiver in receivers[1:]:
+        assert messages[receiver]["attempts"] == 1
+        next_attempt_at = messages[receiver]["next_attempt_at"]
+        assert next_attempt_at.replace(tzinfo=UTC) > now
+
+
+def test_deliver_gives_up_after_max_attempts(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "MAIL_MAX_ATTEMPTS", 1)
+
+    sent, _, messages = asyncio.run(deliver_batch(["rejected@example.com"]))
+
+    assert sent == 0
+    assert messages["rejected@example.com"]["status"] == "failed"
+
+
+def test_deliver_records_unencodable_recipient(smtp_server):
+    receivers = ["ok@example.com", "ü@example.com", "after@example.com"]
+
+    sent, _, messages = asyncio.run(deliver_batch(receivers))
+
+    # The poison message fails alone and the batch outcome is recorded
+    assert sent == 2
+    assert smtp_server.received == ["ok@example.com", "after@example.com"]
+    assert messages["ok@example.com"]["status"] == "sent"
+    assert messages["after@example.com"]["status"] == "sent"
+    poison = messages["ü@example.com"]
+    assert poison["status"] == "pending"
+    assert poison["last_error"].startswith("UnicodeEncodeError")
@@ -0,0 +1,16 @@
+from core.config import settings
+from fastapi.testclient import TestClient
+from main import app
+
+
+def test_oversized_body_response_carries_cors_headers():
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/v1/posts",
+        content=b"x" * (settings.MAX_REQUEST_BODY_BYTES + 1),
+        headers={"Origin": "https://example.com"},
+    )
+
+    assert response.status_code == 413
+    assert "access-control-allow-origin" in response.headers
@@ -0,0 +1,54 @@
+import asyncio
+
+import main
+from bson.objectid import ObjectId
+from core.config import settings
+from core.storage import storage
+from mongomock_motor import AsyncMongoMockClient
+from services.counter_buffer import counter_buffer
+
+
+async def noop(*args, **kwargs):
+    pass
+
+
+def test_shutdown_flushes_deltas_of_a_cancelled_flush(monkeypatch):
+    client = AsyncMongoMockClient()
+    db = client["test"]
+    monkeypatch.setattr(storage, "client", client)
+    monkeypatch.setattr(storage, "db", db)
+    monkeypatch.setattr(storage, "create_indexes", noop)
+    monkeypatch.setattr(storage, "refresh_post_scores", noop)
+    monkeypatch.setattr(settings, "REACTION_WRITE_BEHIND", True)
+    monkeypatch.setattr(settings, "REACTION_FLUSH_SECONDS", 0.01)
+    counter_buffer.drain()
+
+    collection_class = type(db["comments"])
+    bulk_write = collection_class.bulk_write
+    writing = asyncio.Event()
+    calls = []
+
+    async def slow_bulk_write(self, operations, **kwargs):
+        # The periodic flush is held mid write until it is cancelled
+        calls.append(len(calls))
+        if len(calls) == 1:
+            writing.set()
+            await asyncio.sleep(10)
+        return await bulk_write(self, operations, **kwargs)
+
+    monkeypatch.setattr(collection_class, "bulk_write", slow_bulk_write)
+
+    async def run():
+        comment_id = (
+            await db["comments"].insert_one({"likes": 0})
+        ).inserted_id
+        async with main.lifespan(main.app):
+            counter_buffer.add("comments", str(comment_id), 5, 0)
+            await asyncio.wait_for(writing.wait(), 5)
+
+        return await db["comments"].find_one({"_id": ObjectId(comment_id)})
+
+    comment = asyncio.run(run())
+
+    assert comment["likes"] == 5
+    assert counter_buffer.drain() == {}
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import UTC, datetime
+
+import pytest
+from core.authentication.auth_middleware import get_current_user
+from core.authentication.auth_token import create_access_token
+from core.authentication.user_cache import user_cache
+from core.storage import storage
+from mongomock_motor import AsyncMongoMockClient
+
+EMAIL = "user@example.com"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(storage, "db", db)
+    user_cache.clear()
+    date = datetime.now(UTC)
+    asyncio.run(
+        db["users"].insert_one(
+            {
+                "username": "user",
+                "email": EMAIL,
+                "password": "hash",
+                "status": "verified",
+                "role": "user",
+                "subscribed": [],
+                "date_created": date,
+                "date_modified": date,
+            }
+        )
+    )
+
+    yield db
+
+    user_cache.clear()
+
+
+def test_update_during_a_miss_is_not_overwritten(db, monkeypatch):
+    token = create_access_token({"sub": EMAIL, "id": "1", "type": "bearer"})
+    get_user_record = storage.get_user_record
+    loaded = asyncio.Event()
+    updated = asyncio.Event()
+
+    async def slow_get_user_record(filter):
+        # The request's load reads the old record, then waits for the
+        # update to land
+        user = await get_user_record(filter)
+        if not loaded.is_set():
+            loaded.set()
+            await updated.wait()
+        return user
+
+    monkeypatch.setattr(storage, "get_user_record", slow_get_user_record)
+
+    async def run():
+        request = asyncio.create_task(get_current_user(token))
+        await loaded.wait()
+        await storage.update_user_record(
+            {"email": EMAIL}, {"status": "disabled"}
+        )
+        updated.set()
+        return await request
+
+    stale = asyncio.run(run())
+
+    assert stale.status == "verified"
+    assert user_cache.get(EMAIL) is None
+
+
+def test_miss_without_update_is_cached(db):
+    token = create_access_token({"sub": EMAIL, "id": "1", "type": "bearer"})
+
+    user = asyncio.run(get_current_user(token))
+
+    assert user_cache.get(EMAIL) == user